@@ -0,0 +1,205 @@
+"""Бенчмарк коллектора на сохранённых страницах Steam без обращения к Steam.
+
+Локальный HTTP сервер отдаёт выдачу поиска, страницы игр и страницы родительских игр DLC
+из benchmarks/fixtures. Фикстуры можно заменить на реально сохранённые страницы,
+подставив __APP_ID__ / __BASE__ / __PARENT_ID__ вместо app_id и адреса магазина.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_scraper --games 40 --output bench_results.jsonl
+"""
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+from loguru import logger
+from src import collector
+from src.parsers import BS4Parser, LxmlParser
+
+
+FIXTURES = Path(__file__).parent / "fixtures"
+FIRST_APP_ID = 1000000
+DLC_EVERY = 5           # Каждая N-я игра в выдаче - DLC к бесплатной игре
+PARENT_OFFSET = 500000  # app_id родительской игры = app_id DLC + PARENT_OFFSET
+
+
+def load_fixture(name, page_kb=0):
+    """Читаем фикстуру и раздуваем до page_kb, чтобы размер был как у настоящей страницы Steam"""
+    text = (FIXTURES / name).read_text(encoding="utf-8")
+    if page_kb:
+        filler = '<div class="home_area_spotlight"><a href="https://store.steampowered.com/app/1/">spotlight</a></div>\n'
+        missing = page_kb * 1024 - len(text.encode("utf-8"))
+        if missing > 0:
+            text = text.replace("<!--__PADDING__-->", filler * (missing // len(filler) + 1))
+    return text
+
+
+class FixtureServer:
+    """Подменяет store.steampowered.com: /search/results/ и /app/<id>/"""
+
+    def __init__(self, total_games, page_kb):
+        self.total_games = total_games
+        self.requests = 0
+        self.bytes_sent = 0
+        self.row = load_fixture("search_row.html")
+        self.app = load_fixture("app.html", page_kb)
+        self.dlc_bubble = load_fixture("dlc_bubble.html")
+        self.dlc_parent = load_fixture("dlc_parent.html", page_kb)
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.httpd.daemon_threads = True
+        self.base = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path.startswith("/search/results"):
+                    body, content_type = server.search_page(parse_qs(url.query)), "application/json"
+                elif url.path.startswith("/app/"):
+                    body, content_type = server.app_page(int(url.path.split("/")[2])), "text/html; charset=UTF-8"
+                else:
+                    self.send_error(404)
+                    return
+
+                data = body.encode("utf-8")
+                server.requests += 1
+                server.bytes_sent += len(data)
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def search_page(self, query):
+        start = int(query.get("start", ["0"])[0])
+        count = int(query.get("count", ["50"])[0])
+        app_ids = range(FIRST_APP_ID + start, FIRST_APP_ID + min(start + count, self.total_games))
+        rows = "".join(self.row.replace("__APP_ID__", str(app_id)).replace("__BASE__", self.base) for app_id in app_ids)
+        return json.dumps({"success": 1, "results_html": rows, "total_count": self.total_games, "start": start})
+
+    def app_page(self, app_id):
+        if app_id >= FIRST_APP_ID + PARENT_OFFSET:
+            return self.dlc_parent.replace("__APP_ID__", str(app_id))
+
+        page = self.app
+        if (app_id - FIRST_APP_ID) % DLC_EVERY == DLC_EVERY - 1:
+            bubble = self.dlc_bubble.replace("__PARENT_ID__", str(app_id + PARENT_OFFSET))
+            page = page.replace("<!--__DLC_BUBBLE__-->", bubble)
+        return page.replace("__APP_ID__", str(app_id)).replace("__BASE__", self.base)
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def bench_parsers(page_kb, repeat):
+    """Среднее время разбора одной страницы каждым парсером, мс"""
+    app_page = load_fixture("app.html", page_kb).replace("<!--__DLC_BUBBLE__-->", load_fixture("dlc_bubble.html"))
+    parent_page = load_fixture("dlc_parent.html", page_kb)
+    row = load_fixture("search_row.html")
+    search_html = "".join(row.replace("__APP_ID__", str(FIRST_APP_ID + i)) for i in range(50))
+
+    results = {}
+    for parser in (BS4Parser(), LxmlParser()):
+        for name, method, page in (
+            ("app", parser.app_page, app_page),
+            ("dlc_parent", parser.dlc_parent_price, parent_page),
+            ("search_50", parser.search_rows, search_html),
+        ):
+            started = time.perf_counter()
+            for _ in range(repeat):
+                method(page)
+            results[f"parse_ms_{parser.name}_{name}"] = round((time.perf_counter() - started) / repeat * 1000, 3)
+    return results
+
+
+def bench_scrape(games, page_kb, parser, concurrency):
+    """Полный прогон get_games против локального сервера"""
+    config = {
+        **collector.DEFAULT_CONFIG,
+        "concurrency": concurrency,
+        "rate_limit": {"max_rps": 0},
+        "parser": parser,
+        "incremental": False,
+        "cache": {"enabled": False},
+        "failed_queue": str(Path(tempfile.gettempdir()) / "bench_failed_games.json"),
+    }
+
+    with FixtureServer(games, page_kb) as server:
+        collector.SEARCH_URL = f"{server.base}/search/results/"
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        games_list = asyncio.run(collector.get_games(config=config))
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        "games": len(games_list or {}),
+        "requests": server.requests,
+        "scrape_s": round(elapsed, 3),
+        "pages_per_s": round(server.requests / elapsed, 1),
+        "mb_transferred": round(server.bytes_sent / 1024 / 1024, 2),
+        "peak_mem_mb": round(peak / 1024 / 1024, 2),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except FileNotFoundError:
+        return None
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Бенчмарк коллектора на локальных фикстурах")
+    arg_parser.add_argument("--games", type=int, default=40, help="Сколько бесплатных игр в выдаче")
+    arg_parser.add_argument("--page-kb", type=int, default=400, help="Размер страницы игры, КБ")
+    arg_parser.add_argument("--parser", default="lxml", help="Парсер для полного прогона: lxml или bs4")
+    arg_parser.add_argument("--concurrency", type=int, default=collector.DEFAULT_CONFIG["concurrency"])
+    arg_parser.add_argument("--repeat", type=int, default=20, help="Повторов при замере парсеров")
+    arg_parser.add_argument("--output", help="Дописать результат строкой JSON в файл (для сравнения коммитов)")
+    args = arg_parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="ERROR")
+
+    result = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "params": vars(args) | {"output": None},
+        **bench_parsers(args.page_kb, args.repeat),
+        **bench_scrape(args.games, args.page_kb, args.parser, args.concurrency),
+    }
+
+    for key, value in result.items():
+        print(f"{key:32} {value}")
+
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,16 @@
 from loguru import logger
 import sys
+import time
 from src import collector
 from src import automation
+from src.archive import GameArchive, apply_retention
+from src.journal import StatusJournal
+from src.models import Game, GameCollection
+from src.storage import get_store
+from src.utils.browser_service import close_browser_service
+from src.utils.http_session import close_session
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 import asyncio
-import json
-import os
 
 
 logger.remove()
@@ -24,48 +29,148 @@ logger.add(
 
 
 @logger.catch
-def games_list_update(games_list):
-    """Обновляет список игр, сохраняя статусы из старого файла"""
-    file_path = "data/games.json"
-    
+def games_list_update(games_list, archive=None):
+    """Обновляет список игр в базе, сохраняя статусы уже известных и архивных игр"""
+    store = get_store()
+
     if games_list is None:
         logger.error("games_list is None, используем пустой словарь")
         games_list = {}
-    
-    if os.path.exists(file_path):
-        with open(file_path, "r", encoding="utf-8") as f:
-            try:
-                old_games = json.load(f)
-            except json.JSONDecodeError:
-                old_games = {}
-                logger.error("Файл games.json поврежден или пустой.")
-    else:
-        old_games = {}
-        logger.debug("Файл games.json не существует, создаем новый")
-    
-    for app_id, new_info in games_list.items():
-        if app_id in old_games:
-            new_info["status"] = old_games[app_id].get("status", "new")
-        else:
-            new_info["status"] = "new"
-    
-    for app_id, old_info in old_games.items():
-        if app_id not in games_list:
-            games_list[app_id] = old_info
-    
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(games_list, f, ensure_ascii=False, indent=4)
-    
-    new_count = sum(1 for g in games_list.values() if g.get("status") == "new")
-    logger.debug(f"Обновлен список игр: всего {len(games_list)}, новых: {new_count}")
-    
+
+    # Игра могла вернуться в выдачу после переноса в архив - берём статус оттуда
+    archived = {}
+    if archive:
+        known = store.statuses(games_list)
+        found = archive.find_many(app_id for app_id in games_list if app_id not in known)
+        archived = {app_id: record["status"] for app_id, record in found.items()}
+
+    # Старые игры из базы здесь не удаляются, обновляются только найденные коллектором
+    store.merge_scraped(games_list, archived)
+
+    logger.debug(f"Обновлен список игр: всего {len(store)}, новых: {store.count_by_status('new')}")
+
     return games_list
 
 
 @logger.catch
-async def auto_collector():
-    new_games_list = collector.get_games()
+async def pipeline_collector(store, journal, config, skipped=None):
+    """Режим конвейера (pipeline.enabled в collector_config.json): поиск, сохранение и сбор идут одновременно.
+    Коллектор отдаёт каждую найденную игру в очередь, этап сохранения пишет её в базу,
+    а новые игры сразу уходят на сбор. Очереди ограничены - быстрый этап ждёт медленный.
+    """
+    queue_size = config["pipeline"]["queue_size"]
+    scraped = asyncio.Queue(maxsize=queue_size)
+    to_collect = asyncio.Queue(maxsize=queue_size)
+    archive = GameArchive(config["retention"]["dir"])
+    games = GameCollection()
+
+    async def scrape():
+        try:
+            return await collector.get_games(known_games=store, config=config, emit=scraped, skipped=skipped)
+        finally:
+            await scraped.put(None)
+
+    async def persist():
+        try:
+            # Игры, оставшиеся new с прошлых запусков, уходят на сбор первыми
+            for app_id, info in store.get_by_status("new").items():
+                game = Game.from_dict(app_id, info)
+                games.add(game)
+                await to_collect.put(game)
+
+            # Статусы архива читаем один раз за запуск и только если попалась незнакомая игра
+            archived = None
+            while (item := await scraped.get()) is not None:
+                app_id, info = item
+                if app_id not in store and archived is None:
+                    archived = await asyncio.to_thread(archive.statuses)
+                store.merge_scraped({app_id: info}, archived)
+
+                if info["status"] == "new" and app_id not in games:
+                    game = Game.from_dict(app_id, info)
+                    games.add(game)
+                    await to_collect.put(game)
+        finally:
+            await to_collect.put(None)
+
+    # TaskGroup: если один этап упал, остальные отменяются и не ждут вечно на полной очереди
+    async with asyncio.TaskGroup() as group:
+        scrape_task = group.create_task(scrape())
+        group.create_task(persist())
+        group.create_task(automation.collect_stream(to_collect, journal))
+
+    # Сначала статусы после сбора, потом полный список выдачи: merge_scraped их сохранит,
+    # а заодно обновит last_seen и цены регионов у всех игр
+    scraped_list = scrape_task.result()
+    if len(games):
+        store.upsert_many(games.to_dict())
+        # Счётчик неудачного сбора живёт только в коллекции - не даём выдаче его затереть
+        for game in games.with_status("new"):
+            if scraped_list and game.app_id in scraped_list and game.collect_attempts:
+                scraped_list[game.app_id]["collect_attempts"] = game.collect_attempts
+    games_list_update(scraped_list, archive)
+    apply_retention(store, archive, config["retention"]["archive_after_days"])
+    journal.truncate()
+
+    if len(games):
+        logger.success(f"Конвейер завершен: игр на сбор {len(games)}, забрано {games.count('collected')}")
+    else:
+        logger.info("Новых игр нет, браузер не понадобился")
+
+
+def listing_unchanged(store, config, state, fingerprint):
+    """Выдача та же, что при прошлом полном запуске, и доделывать нечего - полный запуск можно пропустить"""
+    if not fingerprint or fingerprint != state.get("fingerprint"):
+        return False
+
+    # Очередь повторов и незабранные игры ждут полного запуска, даже если выдача не менялась.
+    # Кроме отложенных: они не получаются раз за разом и ждут полного запуска по изменению выдачи
+    limit = config["park_after_attempts"]
+    pending = [app_id for app_id, entry in collector.load_failed(config["failed_queue"]).items()
+               if not collector.is_parked(entry.get("attempts"), limit)]
+    pending += [app_id for app_id, info in store.get_by_status("new").items()
+                if not collector.is_parked(info.get("collect_attempts"), limit)]
+    if pending:
+        logger.info(f"🔎 Выдача не изменилась, но есть незавершённые игры ({len(pending)}) - полный запуск")
+        return False
+
+    state["skipped_runs"] = state.get("skipped_runs", 0) + 1
+    state["checked_at"] = time.time()
+    collector.save_probe_state(state, config["probe"]["path"])
+
+    changed_at = time.strftime("%Y-%m-%d %H:%M", time.localtime(state["changed_at"]))
+    logger.info(f"🔎 Выдача не менялась с {changed_at}, полный запуск пропущен (всего пропущено: {state['skipped_runs']})")
+    return True
+
+
+def remember_listing(store, config, state, fingerprint, probed, skipped=()):
+    """Запоминаем отпечаток выдачи после полного запуска.
+    Только если все игры из проверки попали в базу - иначе следующий запуск пропустил бы недособранные.
+    skipped - игры, которые коллектор отбросил намеренно, их в базе и не должно быть.
+    """
+    if not fingerprint:
+        return
+
+    expected = set(probed) - set(skipped)
+    missing = len(expected) - len(store.statuses(expected))
+    if missing:
+        logger.warning(f"🔎 Игр из выдачи нет в базе: {missing}, отпечаток не сохраняем")
+        return
+
+    now = time.time()
+    if fingerprint != state.get("fingerprint"):
+        state["changed_at"] = now
+    state["fingerprint"] = fingerprint
+    state["checked_at"] = now
+    state.setdefault("skipped_runs", 0)
+    collector.save_probe_state(state, config["probe"]["path"])
+
+
+@logger.catch
+async def phased_collector(store, journal, config, skipped=None):
+    """Обычный режим: поиск целиком, потом обновление базы, потом сбор новых игр"""
+    # Хранилище передаём коллектору, чтобы он не качал страницы уже известных игр
+    new_games_list = await collector.get_games(known_games=store, config=config, skipped=skipped)
     
     # ✅ Проверка что коллектор вернул данные
     if new_games_list is None:
@@ -78,21 +183,51 @@ async def auto_collector():
     
     logger.info(f"Получено игр от коллектора: {len(new_games_list)}")
     
-    games_list = games_list_update(new_games_list)
+    retention = config["retention"]
+    archive = GameArchive(retention["dir"])
+    games_list_update(new_games_list, archive)
+    # Давно пропавшие из выдачи игры уносим в архив, чтобы база не росла бесконечно
+    apply_retention(store, archive, retention["archive_after_days"])
     
-    new_games = sum(1 for g in games_list.values() if g.get("status") == "new")
+    new_games = store.count_by_status("new")
     
     if new_games > 0:
         logger.info(f"Запускаем сбор для {new_games} новых игр")
-        games_list = await automation.collect_games(games_list)
+        games = await automation.collect_games(store.get_by_status("new"), journal)
         
-        if games_list:
-            with open("data/games.json", "w", encoding="utf-8") as f:
-                json.dump(games_list, f, indent=4, ensure_ascii=False)
+        if games:
+            store.upsert_many(games.to_dict())
+            journal.truncate()
             logger.success("Сбор завершен, данные сохранены")
     else:
         logger.info("Новых игр нет, пропускаем автоматизацию")
-    
+
+
+@logger.catch
+async def auto_collector():
+    store = get_store()
+    journal = StatusJournal()
+    # Если прошлый сбор упал на середине - возвращаем в базу уже забранные игры
+    journal.replay(store)
+
+    config = collector.load_config()
+
+    # Дешёвая проверка: только страницы поиска. Если выдача та же - полный запуск не нужен
+    state, fingerprint, probed = {}, None, None
+    if config["probe"]["enabled"]:
+        state = collector.load_probe_state(config["probe"]["path"])
+        fingerprint, probed = await collector.probe_listing(config)
+        if listing_unchanged(store, config, state, fingerprint):
+            logger.info("Ждем следующего запуска функции.")
+            return
+
+    skipped = set()
+    if config["pipeline"]["enabled"]:
+        await pipeline_collector(store, journal, config, skipped)
+    else:
+        await phased_collector(store, journal, config, skipped)
+
+    remember_listing(store, config, state, fingerprint, probed, skipped)
     logger.info("Ждем следующего запуска функции.")
 
 
@@ -111,6 +246,9 @@ async def main():
         await asyncio.Event().wait()
     except (KeyboardInterrupt, SystemExit):
         logger.warning("Скрипт остановлен пользователем")
+    finally:
+        await close_browser_service()
+        close_session()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,136 @@
+import gzip
+import json
+import sys
+import time
+from pathlib import Path
+from loguru import logger
+
+
+ARCHIVE_DIR = Path("data") / "archive"
+
+
+class GameArchive:
+    """Архив старых игр: по одному сжатому JSONL сегменту на месяц (games-2025-01.jsonl.gz).
+    Сегменты только дописываются, в живой базе остаются актуальные и ожидающие сбора игры.
+    """
+
+    def __init__(self, archive_dir=ARCHIVE_DIR):
+        self.archive_dir = Path(archive_dir)
+
+    def _segment(self, month):
+        return self.archive_dir / f"games-{month}.jsonl.gz"
+
+    def segments(self):
+        return sorted(self.archive_dir.glob("games-*.jsonl.gz"))
+
+    def append(self, games):
+        """Дописываем игры в сегменты по месяцу, когда игру последний раз видели в выдаче"""
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        archived_at = time.time()
+
+        by_month = {}
+        for app_id, info in games.items():
+            month = time.strftime("%Y-%m", time.localtime(info.get("last_seen") or archived_at))
+            by_month.setdefault(month, []).append({"app_id": app_id, **info, "archived_at": archived_at})
+
+        for month, records in by_month.items():
+            # Каждый вызов дописывает новый gzip member - gzip читает их подряд как один поток
+            with gzip.open(self._segment(month), "at", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+        return len(games)
+
+    def iter_records(self, month=None):
+        """Все записи архива (или одного месяца YYYY-MM) по порядку"""
+        segments = [self._segment(month)] if month else self.segments()
+        for segment in segments:
+            if not segment.exists():
+                continue
+            try:
+                with gzip.open(segment, "rt", encoding="utf-8") as f:
+                    for line in f:
+                        yield json.loads(line)
+            except (EOFError, OSError, json.JSONDecodeError) as e:
+                # Недописанный при падении хвост сегмента - всё, что до него, уже отдали
+                logger.warning(f"Сегмент архива {segment.name} обрезан: {e}")
+
+    def find_many(self, app_ids):
+        """Последние записи архива по app_ids"""
+        app_ids = set(app_ids)
+        found = {}
+        if not app_ids:
+            return found
+        for record in self.iter_records():
+            if record["app_id"] in app_ids:
+                found[record["app_id"]] = record
+        return found
+
+    def statuses(self):
+        """Статусы всех игр архива {app_id: status} за один проход по сегментам"""
+        return {record["app_id"]: record.get("status", "new") for record in self.iter_records()}
+
+    def find(self, app_id):
+        return self.find_many([app_id]).get(app_id)
+
+    def search(self, text=None, status=None, month=None):
+        """Поиск по названию (подстрока, без учёта регистра) и статусу"""
+        text = text.lower() if text else None
+        found = {}
+        for record in self.iter_records(month):
+            if status and record.get("status") != status:
+                continue
+            if text and text not in (record.get("name") or "").lower():
+                continue
+            found[record["app_id"]] = record
+        return list(found.values())
+
+
+def apply_retention(store, archive, archive_after_days):
+    """Переносим в архив игры, которых нет в выдаче дольше archive_after_days дней.
+    Забранные игры, которые всё ещё раздаются, остаются в базе, иначе коллектор снова посчитает их новыми.
+    """
+    if not archive_after_days:
+        return 0
+
+    stale = store.select_stale(time.time() - archive_after_days * 86400)
+    if not stale:
+        return 0
+
+    # Сначала пишем архив, потом удаляем из базы: при падении между шагами запись просто задублируется в архиве
+    archive.append(stale)
+    store.delete_many(stale)
+    logger.info(f"🗄️ В архив перенесено игр: {len(stale)}, в базе осталось: {len(store)}")
+    return len(stale)
+
+
+if __name__ == "__main__":
+    # python -m src.archive find <app_id>
+    # python -m src.archive search [текст] [--status collected] [--month 2025-01]
+    # python -m src.archive months
+    args = sys.argv[1:]
+    archive = GameArchive()
+
+    if not args or args[0] not in ("find", "search", "months"):
+        print("Использование: python -m src.archive find <app_id> | search [текст] [--status S] [--month YYYY-MM] | months")
+        sys.exit(1)
+
+    if args[0] == "months":
+        for segment in archive.segments():
+            print(segment.name[len("games-"):-len(".jsonl.gz")])
+
+    elif args[0] == "find":
+        record = archive.find(args[1])
+        print(json.dumps(record, ensure_ascii=False, indent=4) if record else "Не найдено")
+
+    else:
+        options = {"--status": None, "--month": None}
+        text = None
+        rest = iter(args[1:])
+        for arg in rest:
+            if arg in options:
+                options[arg] = next(rest, None)
+            else:
+                text = arg
+        for record in archive.search(text, status=options["--status"], month=options["--month"]):
+            print(f'{record["app_id"]:>10}  {record.get("status", ""):<10}  {record.get("name")}')
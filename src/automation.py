@@ -1,8 +1,14 @@
 import asyncio
+import time
+from src.utils.browser_service import close_browser_service, open_browser
 from src.utils.chrome_manager import ChromeManager
 from src.utils.chrome_manager import HumanBehavior as HB
+from src.journal import StatusJournal
+from src.steam_account import account_session, claim_free_license, fetch_owned_apps, save_cookies
+from src.parsers import parse_app_id
+from src.models import CollectResult, GameCollection, STATUS_BY_RESULT
+from src.storage import GameStore
 from loguru import logger
-import json
 import os
 
 
@@ -50,7 +56,7 @@ async def one_started_run_manual_auth():
 
     if not os.path.isdir(profile_dir):
         logger.info("Нету папки профиля, запукаем авторизацию.")
-        async with ChromeManager() as manager:
+        async with open_browser() as manager:
             page = manager.page
 
             await page.goto("https://store.steampowered.com/", wait_until="domcontentloaded")
@@ -60,42 +66,218 @@ async def one_started_run_manual_auth():
             if not await check_auth(page):
                 await run_manual_auth(manager, page)
 
+            await save_cookies(page.context)
             await HB.sleep()
 
             await page.goto("https://store.steampowered.com/search?term=", wait_until="domcontentloaded")
             await HB.sleep()
 
 
-@logger.catch
-async def collect_game(page, app_id, info):
-    await page.goto(info["url"], wait_until="domcontentloaded")
-    await HB.sleep("long")
-    logger.debug(f'Перешли на страницу игры {info["name"]}, app_id: {app_id}.')
-
-    btn  = page.locator('a[href*="javascript:addToCart"]').first
-    btn2 = page.locator('div.btn_addtocart btn_packageinfo').first
-    if await btn.is_visible():
-        logger.debug("Нашли кнопку забрать в библиотеку.")
-        await HB.move(page, element=btn, click=True, scroll=True)
-
-        logger.info(f"Забрали игру {info['name']} app_id: {app_id}.")
-        await HB.sleep("long")
-
-    elif await btn2.is_visible():
-        logger.debug("Нашли кнопку забрать в библиотеку.")
-        await HB.move(page, element=btn2, click=True, scroll=True)
+ADD_BUTTON_SELECTOR = 'a[href*="javascript:addToCart"], div.btn_addtocart.btn_packageinfo'
+OWNED_SELECTOR = ".game_area_already_owned"
+UNAVAILABLE_SELECTOR = "#error_box"
+LICENSE_URL = "/checkout/addfreelicense"
 
-        logger.debug("Нажали на кнопку и переходим к следующей по списку.")
-        await HB.sleep()
 
-    else:
+async def wait_first(waiters, timeout, action=None):
+    """Ждём первый сработавший сигнал страницы из {имя: корутина ожидания}.
+    action (например клик) выполняется уже после того, как ожидания подписались на события.
+    Возвращает (имя, результат) или (None, None), если за timeout секунд ничего не сработало.
+    """
+    tasks = {asyncio.ensure_future(waiter): name for name, waiter in waiters.items()}
+    loop = asyncio.get_running_loop()
+    try:
+        await asyncio.sleep(0)
+        if action is not None:
+            await action
+        deadline = loop.time() + timeout
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, timeout=max(deadline - loop.time(), 0),
+                                               return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            for task in done:
+                # Ожидание, упавшее с ошибкой (например по таймауту Playwright), сигналом не считается
+                if not task.cancelled() and task.exception() is None:
+                    return tasks[task], task.result()
+        return None, None
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+def is_license_response(response):
+    return LICENSE_URL in response.url and response.request.method == "POST"
+
+
+async def collect_game(page, app_id, name, url, timeout=15):
+    """Забираем игру и ждём подтверждения от самой страницы вместо фиксированных пауз.
+    После перехода ждём кнопку, плашку "уже в библиотеке" или ошибку, после клика - ответ на добавление лицензии.
+    """
+    started = time.perf_counter()
+    ms = timeout * 1000
+
+    await page.goto(url, wait_until="domcontentloaded", timeout=ms)
+    logger.debug(f'Перешли на страницу игры {name}, app_id: {app_id}.')
+
+    # Steam уводит с удалённых и закрытых для региона игр на главную
+    if f"/app/{app_id}" not in page.url:
+        logger.warning(f"Страница игры {name} app_id: {app_id} недоступна, открылась {page.url}.")
+        return CollectResult.UNAVAILABLE
+
+    btn = page.locator(ADD_BUTTON_SELECTOR).first
+    owned = page.locator(OWNED_SELECTOR).first
+    signal, _ = await wait_first({
+        "button": btn.wait_for(state="visible", timeout=ms),
+        "owned": owned.wait_for(state="visible", timeout=ms),
+        "unavailable": page.locator(UNAVAILABLE_SELECTOR).first.wait_for(state="visible", timeout=ms),
+    }, timeout)
+
+    if signal == "owned":
         logger.debug("Игра уже в библиотеке, помечаем как забранная.")
-
-
-
-@logger.catch
-async def collect_games(games_list):
-    async with ChromeManager() as manager:
+        return CollectResult.OWNED
+    if signal == "unavailable":
+        logger.warning(f"Игра {name} app_id: {app_id} недоступна.")
+        return CollectResult.UNAVAILABLE
+    if signal is None:
+        logger.warning(f"На странице игры {name} app_id: {app_id} не нашли ни кнопки, ни отметки о владении.")
+        return CollectResult.FAILED
+
+    logger.debug("Нашли кнопку забрать в библиотеку.")
+    signal, response = await wait_first({
+        "license": page.wait_for_response(is_license_response, timeout=ms),
+        "owned": owned.wait_for(state="visible", timeout=ms),
+    }, timeout, action=HB.move(page, element=btn, click=True, scroll=True))
+
+    elapsed = time.perf_counter() - started
+    if signal == "license" and response.ok:
+        logger.info(f"Забрали игру {name} app_id: {app_id} за {elapsed:.1f} сек.")
+        return CollectResult.COLLECTED
+    if signal == "owned":
+        logger.info(f"Забрали игру {name} app_id: {app_id} за {elapsed:.1f} сек.")
+        return CollectResult.COLLECTED
+
+    status = response.status if signal == "license" else "нет ответа"
+    logger.warning(f"Steam не подтвердил добавление {name} app_id: {app_id} ({status}).")
+    return CollectResult.FAILED
+
+
+def dlc_parent(game):
+    """Основная игра для ДЛС. app_id берём из ссылки: в записях старых версий там лежал slug названия"""
+    dlc = game.dlc
+    if not dlc:
+        return None
+    return {**dlc, "app_id": parse_app_id(dlc["url"]) or dlc["app_id"]}
+
+
+def apply_result(game, result, journal=None):
+    """Переносим итог попытки в статус игры и журнал"""
+    game.status = STATUS_BY_RESULT[result]
+    if result == CollectResult.FAILED:
+        # Счётчик неудач подряд: игры, которые не забираются раз за разом, не держат полный запуск (см. is_parked)
+        game.collect_attempts = (game.collect_attempts or 0) + 1
+    if journal and result != CollectResult.FAILED:
+        journal.append(game.app_id, game.status)
+
+
+async def collect_one(page, game, journal=None, timeout=15):
+    """Забираем одну игру (и основную игру для ДЛС) на своей вкладке, статус пишем в коллекцию и журнал"""
+    dlc = dlc_parent(game)
+
+    try:
+        if dlc:
+            parent = await collect_game(page, dlc["app_id"], dlc["name"], dlc["url"], timeout)
+            if parent in (CollectResult.FAILED, CollectResult.UNAVAILABLE):
+                # Без основной игры ДЛС не добавить - оставляем его new до следующего запуска
+                logger.warning(f"Не забрали игру {dlc['name']}, без неё ДЛС {game.name} не добавить.")
+                result = CollectResult.FAILED
+                apply_result(game, result, journal)
+                return result
+            if parent == CollectResult.COLLECTED:
+                logger.info(f"Забрали игру {dlc['name']} к которой пренадлежит ДЛС {game.name}.")
+        result = await collect_game(page, game.app_id, game.name, game.url, timeout)
+
+    except Exception as e:
+        logger.error(f"Сбой на {game.app_id}: {e}")
+        result = CollectResult.FAILED
+
+    apply_result(game, result, journal)
+    return result
+
+
+async def claim_direct(session, game, owned):
+    """Прямой запрос лицензии для игры (и основной игры для ДЛС). None - нужен браузер"""
+
+    async def claim(app_id, url):
+        try:
+            return await asyncio.to_thread(claim_free_license, session, app_id, url)
+        except Exception as e:
+            logger.debug(f"Прямой запрос лицензии для {app_id} не удался: {e}")
+            return None
+
+    parent = dlc_parent(game)
+    if parent and parent["app_id"] not in owned:
+        result = await claim(parent["app_id"], parent["url"])
+        if result is None:
+            return None
+        if result == CollectResult.UNAVAILABLE:
+            # Недоступна основная игра, а не сам ДЛС - он остаётся new до следующего запуска
+            logger.warning(f"Основная игра {parent['name']} недоступна, ДЛС {game.name} не добавить.")
+            return CollectResult.FAILED
+
+    if game.app_id in owned:
+        return CollectResult.OWNED
+    return await claim(game.app_id, game.url)
+
+
+async def confirm_claims(session, claimed, journal=None):
+    """Ответ на форму не гарантирует лицензию - подтверждаем по библиотеке, неподтверждённые забирает браузер"""
+    owned = await asyncio.to_thread(fetch_owned_apps, session) or set()
+    confirmed = [game for game in claimed if game.app_id in owned]
+    for game in confirmed:
+        apply_result(game, CollectResult.COLLECTED, journal)
+        logger.info(f"Забрали игру {game.name} app_id: {game.app_id} без браузера.")
+    if len(confirmed) < len(claimed):
+        logger.warning(f"Не подтвердились прямые запросы: {len(claimed) - len(confirmed)}, их заберёт браузер.")
+    return confirmed
+
+
+async def collect_without_browser(games, session, journal=None):
+    """Проверяем библиотеку одним запросом и забираем игры прямыми запросами лицензий (direct_claim в chrome_config.json).
+    Игры, для которых это не сработало, остаются new и уходят в браузер.
+    """
+    owned = await asyncio.to_thread(fetch_owned_apps, session)
+    if owned is None:
+        return
+
+    for game in games.with_status("new"):
+        if game.app_id in owned:
+            apply_result(game, CollectResult.OWNED, journal)
+    logger.info(f"📚 Проверили библиотеку без браузера, осталось забрать: {games.count('new')}")
+
+    if not games.count("new") or not ChromeManager().config.get("direct_claim"):
+        return
+
+    claimed = []
+    for game in games.with_status("new"):
+        result = await claim_direct(session, game, owned)
+        if result == CollectResult.COLLECTED:
+            claimed.append(game)
+        elif result is not None:
+            apply_result(game, result, journal)
+
+    if claimed:
+        await confirm_claims(session, claimed, journal)
+
+
+async def browser_stage(queue, journal=None, max_tabs=None, on_claim=None):
+    """Браузерная часть сбора: вкладки одного авторизованного контекста разбирают игры (Game) из очереди.
+    None в очереди - игр больше не будет. Число вкладок - collect_tabs в chrome_config.json.
+    on_claim - вызывается после каждой забранной игры (для замера времени до первой игры).
+    """
+    async with open_browser() as manager:
         page = manager.page
 
         await page.goto("https://store.steampowered.com/", wait_until="domcontentloaded")
@@ -105,35 +287,187 @@ async def collect_games(games_list):
         if not await check_auth(page):
             await run_manual_auth(manager, page)
 
-        for app_id, info in games_list.items():
-            if info["status"] != "new":
-                continue
-            dlc = info["dlc"]
+        # Свежие куки для проверки библиотеки в следующих запусках
+        await save_cookies(page.context)
+
+        tabs = manager.config.get("collect_tabs", 1)
+        tabs = max(1, min(tabs, max_tabs) if max_tabs else tabs)
+        timeout = manager.config.get("collect_timeout", 15)
+        results = {}
+
+        async def worker(tab):
+            while True:
+                game = await queue.get()
+                if game is None:
+                    # Возвращаем метку конца для остальных вкладок
+                    queue.put_nowait(None)
+                    return
+                result = await collect_one(tab, game, journal, timeout)
+                results[result] = results.get(result, 0) + 1
+                if on_claim and result == CollectResult.COLLECTED:
+                    on_claim()
+
+        # Картинки, видео и шрифты для нажатия одной кнопки не нужны - блокируем их до конца сбора
+        blocker = await manager.block_resources()
+        extra_pages = []
+
+        try:
+            # Вкладки открываем в том же контексте - у них общие куки авторизации и блокировка ресурсов
+            for _ in range(tabs - 1):
+                extra_pages.append(await page.context.new_page())
+            if tabs > 1:
+                logger.debug(f"Забираем игры в {tabs} вкладках.")
+
+            await asyncio.gather(*(worker(tab) for tab in [page] + extra_pages))
+        finally:
+            for tab in extra_pages:
+                try:
+                    await tab.close()
+                except Exception as e:
+                    logger.debug(f"Error closing tab: {e}")
+            await manager.unblock_resources()
+
+        if results:
+            logger.info("🎮 Итог сбора: " + ", ".join(f"{result.value}: {count}" for result, count in results.items()))
+
+        if blocker:
+            per_game = blocker.saved_bytes / 1024 / max(sum(results.values()), 1)
+            logger.info(f"🧱 Блокировка ресурсов: {blocker.describe()}, ~{per_game:.0f} КБ на игру")
+
+        return results
 
-            try:
-                if dlc:
-                    await collect_game(page, dlc["app_id"], dlc)
-                    logger.info(f"Забрали игру {dlc['name']} к которой пренадлежит ДЛС {info['name']}.")
-                    await collect_game(page, app_id, info)
-                else:
-                    await collect_game(page, app_id, info)
-                games_list[app_id]["status"] = "collected"
 
+@logger.catch
+async def collect_games(games, journal=None):
+    """Забираем все игры со статусом new. Каждая смена статуса сразу пишется в journal (если передан).
+    games - GameCollection или словарь {app_id: info}, возвращается GameCollection.
+    """
+    if not isinstance(games, GameCollection):
+        games = GameCollection.from_dict(games)
+
+    # Сначала пробуем обойтись без Chrome: куки профиля, проверка библиотеки и прямой запрос лицензии
+    session = await asyncio.to_thread(account_session)
+    if session is not None:
+        try:
+            await collect_without_browser(games, session, journal)
+        finally:
+            session.close()
+
+    if not games.count("new"):
+        logger.info("Для браузера игр не осталось, Chrome не запускаем.")
+        return games
+
+    # Перебираем только игры из индекса new, а не весь список
+    queue = asyncio.Queue()
+    for game in games.with_status("new"):
+        queue.put_nowait(game)
+    queue.put_nowait(None)
+
+    await browser_stage(queue, journal, max_tabs=queue.qsize() - 1)
+    return games
+
+
+async def collect_stream(queue, journal=None, confirm_delay=10):
+    """Сбор для режима конвейера: игры (Game) приходят из очереди по мере того, как их находит коллектор.
+    Уже купленные и забранные прямым запросом игры браузер не трогают, остальные уходят в browser_stage.
+    Прямые запросы подтверждаются пачкой - одним запросом библиотеки через confirm_delay секунд
+    после первого неподтверждённого или в конце потока.
+    Chrome запускается только при первой игре, которую нужно забрать через браузер.
+    """
+    session = await asyncio.to_thread(account_session)
+    owned = await asyncio.to_thread(fetch_owned_apps, session) if session is not None else None
+    direct = owned is not None and ChromeManager().config.get("direct_claim")
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    first_claim = None
+
+    def on_claim():
+        nonlocal first_claim
+        if first_claim is None:
+            first_claim = loop.time() - started
+            logger.info(f"⏱️ Первая игра забрана через {first_claim:.1f} сек после старта конвейера")
+
+    # Очередь браузера без ограничения: если Chrome не поднялся, конвейер не должен встать
+    browser_queue = asyncio.Queue()
+    browser = None
+
+    def to_browser(game):
+        nonlocal browser
+        if browser is None:
+            browser = asyncio.create_task(browser_stage(browser_queue, journal, on_claim=on_claim))
+        browser_queue.put_nowait(game)
+
+    claimed = []
+    confirm_at = None
+
+    async def confirm():
+        nonlocal confirm_at
+        batch = claimed[:]
+        claimed.clear()
+        confirm_at = None
+        confirmed = await confirm_claims(session, batch, journal)
+        if confirmed:
+            on_claim()
+        for game in batch:
+            if game not in confirmed:
+                to_browser(game)
+
+    try:
+        while True:
+            timeout = None if confirm_at is None else max(confirm_at - loop.time(), 0)
+            try:
+                game = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                await confirm()
+                continue
+            if game is None:
+                break
+
+            result = None
+            if owned is not None and game.app_id in owned:
+                result = CollectResult.OWNED
+            elif direct:
+                result = await claim_direct(session, game, owned)
+                if result == CollectResult.COLLECTED:
+                    claimed.append(game)
+                    confirm_at = confirm_at or loop.time() + confirm_delay
+                    continue
+
+            if result is None:
+                to_browser(game)
+            else:
+                apply_result(game, result, journal)
+
+        if claimed:
+            await confirm()
+
+    finally:
+        if session is not None:
+            session.close()
+        if browser is not None:
+            browser_queue.put_nowait(None)
+            try:
+                await browser
             except Exception as e:
-                games_list[app_id]["status"] = "new"
-                logger.error(f"Сбой на {app_id}: {e}")
-
-        return games_list
-
+                logger.error(f"Браузерная часть конвейера упала: {e}")
 
 
 if __name__ == "__main__":
-    with open("data/games.json", "r", encoding="utf-8") as f:
-        games_list = json.load(f)
+    store = GameStore()
+    journal = StatusJournal()
+    journal.replay(store)
+
+    async def run_once():
+        try:
+            return await collect_games(store.get_by_status("new"), journal)
+        finally:
+            await close_browser_service()
 
-    games_list = asyncio.run(collect_games(games_list))
+    games = asyncio.run(run_once())
 
-    with open("data/games.json", "w", encoding="utf-8") as f:
-        json.dump(games_list, f, indent=4, ensure_ascii=False)
+    if games:
+        store.upsert_many(games.to_dict())
+        journal.truncate()
 
 
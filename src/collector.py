@@ -1,223 +1,441 @@
-import requests
-import time
-import re
-from bs4 import BeautifulSoup as BS
-from fake_useragent import UserAgent
+import asyncio
+import hashlib
+import json
+from pathlib import Path
 from loguru import logger
+from src.parsers import get_parser
+from src.utils.circuit_breaker import CircuitBreaker
+from src.utils.fetcher import AsyncFetcher
+from src.utils.files import atomic_write_json
+from src.utils.http_cache import HttpCache
+from src.utils.rate_limiter import AdaptiveRateLimiter
+
+
+CONFIG_PATH = Path("config") / "collector_config.json"
+# Поля из выдачи поиска, по изменению которых известную игру нужно перепарсить
+LISTING_FIELDS = ("discounted_price", "currency_symbol", "original_price")
+SEARCH_URL = 'https://store.steampowered.com/search/results/'
+SEARCH_PARAMS = {
+    "force_infinite": 1,
+    "maxprice": "free",
+    "specials": 1,
+    "ndl": 1,
+    "infinite": 1,  # Ответ в JSON с results_html и total_count, можно листать через start/count
+    "snr": "1_7_7_230_7",
+}
+
+DEFAULT_CONFIG = {
+    "concurrency": 4,   # Сколько страниц игр качаем одновременно
+    "rate_limit": {
+        "start_rps": 1.0,   # С какой скорости начинаем (запросов в секунду)
+        "min_rps": 0.2,
+        "max_rps": 4.0,     # Потолок, до которого разгоняемся пока Steam отвечает нормально. 0 - без лимита
+        "burst": 2,
+        "increase": 0.1,    # Прибавка скорости после каждого успешного ответа
+        "backoff_base": 2.0,    # Пауза после 429/5xx без Retry-After, удваивается с каждой ошибкой подряд
+        "backoff_max": 120.0,
+        "hosts": {}         # Свой потолок для хоста: {"store.steampowered.com": 3.0}
+    },
+    "timeout": 10,
+    "retry": {
+        "attempts": 3,          # Попыток на один запрос (таймаут, обрыв, 429/5xx)
+        "backoff_base": 1.0,    # Пауза между попытками - случайная до base * 2^n сек
+        "backoff_max": 30.0
+    },
+    "circuit_breaker": {
+        "failure_threshold": 5, # Ошибок подряд, после которых перестаём слать запросы
+        "reset_timeout": 60.0   # Через сколько секунд пробуем снова
+    },
+    "failed_queue": "data/failed_games.json",  # Игры, которые не удалось обработать - повторим в следующем цикле
+    "park_after_attempts": 5,   # После стольких неудач подряд игра откладывается: без изменений в выдаче ради неё не запускаемся. 0 - никогда
+    "regions": [],          # Регионы магазина для поиска: [{"cc": "ua", "l": "english"}, {"cc": "us"}]. Пусто - регион по умолчанию
+    "page_size": 50,        # Игр на страницу выдачи поиска (Steam отдаёт не больше 100)
+    "parser": "lxml",       # lxml (быстрый, с откатом на bs4) или bs4
+    "incremental": True,    # Не качаем страницы уже известных игр, если их цена в выдаче не изменилась
+    "retention": {
+        "archive_after_days": 30,   # Игры, которых нет в выдаче дольше, уходят из базы в архив. 0 - не архивировать
+        "dir": "data/archive"
+    },
+    "cache": {
+        "enabled": True,
+        "dir": "data/cache",
+        "max_size_mb": 200,
+        "ttl": {"app": 43200}   # Сек. Страницы игр почти не меняются, после TTL ревалидируем по ETag
+    },
+    "probe": {
+        "enabled": True,    # Перед полным запуском сверяем отпечаток выдачи поиска, без изменений - пропускаем запуск
+        "path": "data/listing_probe.json"
+    },
+    "pipeline": {
+        "enabled": False,   # Конвейер: игры сохраняются и забираются по мере нахождения, не дожидаясь конца поиска
+        "queue_size": 20    # Размер очередей между этапами - быстрый этап ждёт медленный
+    }
+}
 
 
+def load_config():
+    """Загружаем конфиг коллектора, недостающие ключи берём из дефолтного"""
+    if not CONFIG_PATH.exists():
+        CONFIG_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
+            json.dump(DEFAULT_CONFIG, f, indent=2, ensure_ascii=False)
+        logger.debug(f"📝 Создан конфиг: {CONFIG_PATH}")
 
-@logger.catch
-def processing_game(headers, all_games:list = []):
-    
+    with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
+        config = json.load(f)
 
-    return games_list
+    config = {**DEFAULT_CONFIG, **config}
+    config["regions"] = valid_regions(config["regions"])
+    return config
 
 
-@logger.catch
-def get_games():
-    headers = {
-        'Referer': 'https://store.steampowered.com/search/?force_infinite=1&maxprice=free&specials=1&ndl=1',
-        'User-Agent': UserAgent(browsers="chrome", platforms="desktop").random,
-        'Accept': '*/*',
-    }
+def valid_regions(regions):
+    """Оставляем регионы с кодом страны: по "cc" раскладываются цены и отпечаток выдачи"""
+    result = []
+    for region in regions:
+        if not isinstance(region, dict) or not region.get("cc"):
+            logger.error(f"Регион {region} без кода страны \"cc\" пропущен, проверьте regions в {CONFIG_PATH}")
+            continue
+        result.append(region)
+    return result
 
-    # В запросе уже есть параметры фильтрации
-    response = requests.get(
-        'https://store.steampowered.com/search/results?force_infinite=1&maxprice=free&specials=1&ndl=1&snr=1_7_7_230_7', 
-        headers=headers,
-        timeout=10
-        )
-    soup = BS(response.text, "lxml")
-    logger.debug(f"Ответ {response.status_code}")
 
+def load_failed(path):
+    """Очередь игр, которые не удалось обработать в прошлых циклах"""
+    path = Path(path)
+    if not path.exists():
+        return {}
     try:
-        all_games = soup.find("div", id="search_resultsRows")
-        all_games = all_games.find_all("a", recursive=False)
-    except Exception as e:
-        logger.info(f"Сейчас нету бесплатных игр! {e}")
-        return
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except json.JSONDecodeError:
+        logger.error(f"Файл {path} поврежден, очередь повторов сброшена.")
+        return {}
+
+
+def save_failed(failed, path):
+    atomic_write_json(path, failed)
+
+
+def is_parked(attempts, limit):
+    """Игра не обрабатывается или не забирается limit раз подряд (проверка возраста, страница без цены).
+    Её всё ещё пробуем при полных запусках, но полный запуск ради неё одной не нужен.
+    """
+    return bool(limit) and (attempts or 0) >= limit
+
+
+def is_free_row(row):
+    """Проверяем строку выдачи: оставляем только бесплатные игры"""
+    title = row["name"]
+    discounted_price = row["discounted_price"]
+    currency_symbol = row["currency_symbol"]
+    logger.debug(f"Цена: {discounted_price}{currency_symbol}")
+
+    # Проверяем, что цена нулевая. Не знаю почему, но иногда игра может быть не со 100% скидкой, хотя фильтр не должен показывать такие игры
+    # Мне кажется, что это я забыл убрать после исправления какой то части кода.
+    if discounted_price != 0:
+        logger.warning(f"Игра {title} не бесплатна, цена: {discounted_price}{currency_symbol}")
+        return False
+
+    if not row["original_price"]:
+        logger.warning(f"У {title} оригинальная цена не найдена.")
+
+    return True
+
+
+def listing_changed(row, known, region=None):
+    """Изменились ли дешёвые поля выдачи относительно сохранённой записи (для региона - с ценами этого региона)"""
+    if region:
+        known = known.get("regions", {}).get(region["cc"], known)
+    return any(row[field] != known.get(field) for field in LISTING_FIELDS)
+
+
+async def processing_game(fetcher, parser, row):
+    """Качаем страницу игры (и родительской игры для DLC) и собираем полную информацию.
+    Возвращает None если игру надо пропустить, при ошибке загрузки или разбора бросает исключение.
+    """
+    title = row["name"]
+
+    res = await fetcher.get(row["url"])
+    page = parser.app_page(res.text)
+
+    description = page["description"]
+    if not description:
+        logger.warning(f"Описание {title} не найдено.")
+
+    if not page["has_reviews"]:
+        logger.warning(f"Отзывы {title} не найдены.")
+
+    if not page["release_date"]:
+        logger.warning(f"Дата выхода {title} не найдена.")
+
+    # Здесь я не уверен, может быть что, в Steam не указываться разработчик и издатель?.
+    developer = page["developer"]
+    if not developer:
+        developer = {"name": "Не указан", "url": ""}
+        logger.warning(f"Разработчик {title} не найден.")
+
+    # Я думаю полностью скипать DLC к платным играм, так как стим уведомит о скидке что в желаемом.
+    # Если что позже можно будет добавить такую функциональность
+    dlc = page["dlc_parent"]
+    if dlc:
+        logger.debug(f"{title} DLC к игре {dlc['name']}")
+
+        res = await fetcher.get(dlc["url"])
+        price = parser.dlc_parent_price(res.text)
+
+        # Цену не нашли (родитель снят с продажи или страница без блока покупки) - пропускаем как платную
+        if price is None:
+            logger.warning(f"Цена игры {dlc['name']}, к которой прикреплен DLC {title}, не найдена. Пропускаем.")
+            return None
+
+        if price > 0:
+            logger.debug(f"Цена игры {title} к которой прикреплен DLC: {price}")
+            return None
+
+        dlc["price"] = price
+
+    game_info = {
+        "name": title,
+        "url": row["url"],
+        "image": row["image"],
+        "description": description,
+        "discounted_price": row["discounted_price"],
+        "currency_symbol": row["currency_symbol"],
+        "original_price": row["original_price"],
+        "developer": developer,
+        "publisher": page["publisher"],
+        "release_date": page["release_date"],
+        "recent_reviews": page["recent_reviews"],
+        "recent_summary": page["recent_summary"],
+        "dlc": dlc,
+        "status": "new"
+    }
 
-    logger.info(f"Получено {len(all_games)} игр из ответа.")
-    if not all_games:
-        logger.warning("Список игр пуст.")
-        return 
+    logger.info(f"✅ Обработана: {title} | Рейтинг: {page['recent_summary']} ({page['recent_reviews']} отз.)")
+    logger.debug(f"Информация о игре: {game_info}\n{'='*100}")
+
+    return game_info
 
-    games_list = dict()
-    for game in all_games:
-        app_id = game["data-ds-appid"]
-
-        title = game.find("span", class_="title").text
-
-        discounted_price_tag = game.find("div", class_="discount_final_price")
-        discounted_price = 0
-        currency_symbol = "?"
-        if discounted_price_tag:
-            price_text = discounted_price_tag.text.strip()
-            if price_text and len(price_text) > 1:
-                currency_symbol = price_text[-1]
-                try:
-                    discounted_price = re.search(r'[\d,.]+', price_text).group()
-                    discounted_price = float(discounted_price.replace(",", ".").replace(" ", ""))
-                except ValueError:
-                    logger.warning(f"Не удалось распарсить цену: {price_text}")
-        logger.debug(f"Цена: {discounted_price}{currency_symbol}")
-
-        # Проверяем, что цена нулевая. Не знаю почему, но иногда игра может быть не со 100% скидкой, хотя фильтр не должен показывать такие игры
-        # Мне кажется, что это я забыл убрать после исправления какой то части кода.
-        if discounted_price != 0:
-            logger.warning(f"Игра {title} не бесплатна, цена: {discounted_price}{currency_symbol}")
-            continue
 
-        url = game.get("href")
+def build_fetcher(config):
+    """Собираем fetcher по конфигу: общая сессия, кэш, адаптивный лимитер, повторы и предохранитель"""
+    cache_config = config["cache"]
+    cache = None
+    if cache_config.get("enabled"):
+        cache = HttpCache(
+            cache_dir=cache_config["dir"],
+            max_size_mb=cache_config["max_size_mb"],
+            ttl=cache_config["ttl"]
+            )
 
-        image = game.find("div", class_="search_capsule").find("img").get("src")
+    rate_limit = config["rate_limit"]
+    limiter = AdaptiveRateLimiter(**rate_limit) if rate_limit.get("max_rps") else None
+
+    # Поиск, страницы игр и DLC идут через одну сессию с общим пулом соединений
+    return AsyncFetcher(
+        concurrency=config["concurrency"],
+        limiter=limiter,
+        timeout=config["timeout"],
+        cache=cache,
+        breaker=CircuitBreaker(**config["circuit_breaker"]),
+        **config["retry"]
+        )
 
-        orig_price_tag = game.find("div", class_="discount_original_price")
-        original_price = orig_price_tag.text.strip() if orig_price_tag else None
-        if not original_price:
-            logger.warning(f"У {title} оригинальная цена не найдена.")
 
-        res = requests.get(
-            url,
-            headers=headers,
-            timeout=10
-            )
-        logger.debug(f'Ответ {res.status_code}')
-        soup = BS(res.text, "lxml")
-
-        desc_tag = soup.find("div", class_="game_description_snippet")
-        description = desc_tag.text.strip() if desc_tag else None
-        if not description:
-            logger.warning(f"Описание {title} не найдено.")
-
-        # Просто перешли в удобный блок для дальнейшей разборки
-        mini_div_info = soup.find("div", class_="glance_ctn_responsive_left")
-
-        user_reviews = mini_div_info.find("div", id="userReviews") # блок с впечатлениями и отзывами
-        review_summary = None
-        review_count = None
-        if user_reviews:
-            recent_reviews_row = user_reviews.find("div", class_="summary column")
-            review = recent_reviews_row.find_all("span")
-
-            if review:
-                review_summary = review[0].text.strip()
-
-                try:
-                    review_count_text = review[1].text.strip()
-                    review_count = int(review_count_text.strip("()").replace(",", "").replace(" ", ""))
-                except Exception as e:
-                    review_count = None
-                    logger.debug(f"Недостаточно обзоров для расчета рейтинга: Ошибка: {e}")
+async def iter_search_rows(fetcher, parser, page_size=50, region=None):
+    """Асинхронный генератор по страницам выдачи поиска (JSON вариант infinite=1).
+    Отдаёт разобранные строки сразу по мере прихода каждой страницы.
+    region - {"cc": ..., "l": ...} для поиска в другом регионе магазина.
+    """
+    # В запросе уже есть параметры фильтрации
+    params = dict(SEARCH_PARAMS)
+    if region:
+        params.update({key: region[key] for key in ("cc", "l") if region.get(key)})
+
+    start = 0
+    total = None
+    while total is None or start < total:
+        response = await fetcher.get(SEARCH_URL, params={**params, "start": start, "count": page_size})
+        try:
+            data = json.loads(response.text)
+        except json.JSONDecodeError as e:
+            # Не обрываем выдачу молча: иначе обрезанный список выглядел бы полным
+            raise ValueError(f"Не удалось разобрать страницу поиска (start={start}): {e}") from e
+
+        total = data.get("total_count") or 0
+        games = parser.search_rows(data.get("results_html") or "")
+        logger.debug(f"Страница поиска start={start}: {len(games)} игр из {total}")
+        if not games:
+            return
+
+        for row in games:
+            if is_free_row(row):
+                yield row
+
+        start += len(games)
+
+
+def load_probe_state(path):
+    """Последний отпечаток выдачи, когда он менялся и сколько полных запусков пропущено"""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except json.JSONDecodeError:
+        logger.error(f"Файл {path} поврежден, отпечаток выдачи сброшен.")
+        return {}
 
-        else:
-            logger.warning(f"Отзывы {title} не найдены.")
 
+def save_probe_state(state, path):
+    atomic_write_json(path, state)
 
-        release_date_tag = mini_div_info.find("div", class_="date")
-        release_date = release_date_tag.text.strip() if release_date_tag else None
-        if not release_date:
-            logger.warning(f"Дата выхода {title} не найдена.")
 
-        # Здесь я не уверен, может быть что, в Steam не указываться разработчик и издатель?.
-        developer_div = mini_div_info.find("div", id="developers_list")
-        developer_link = developer_div.find("a") if developer_div else None
+async def probe_listing(config=None, regions=None):
+    """Лёгкая проверка перед полным запуском: только страницы поиска, без страниц игр.
+    Возвращает (отпечаток, app_ids) - sha256 от отсортированных app_id с ценами во всех регионах,
+    или (None, None), если поиск не удался: тогда нужен полный запуск.
+    """
+    config = config or load_config()
+    fetcher = build_fetcher(config)
+    parser = get_parser(config["parser"])
+    regions = regions or config["regions"] or [None]
 
-        if developer_link:
-            developer = {
-                "name": developer_link.text.strip(),
-                "url": developer_link.get("href", "")
-            }
-        else:
-            developer = {"name": "Не указан", "url": ""}
-            logger.warning(f"Разработчик {title} не найден.")
-
-        publisher_tag = mini_div_info.find_all("div", class_="dev_row")[-1]
-        publisher_name = None
-        publisher_url = None
-        if publisher_tag:
-            publisher_link = publisher_tag.find("a")
-            publisher_name = publisher_link.text.strip() if publisher_link else None
-            publisher_url = publisher_link["href"] if publisher_link and publisher_link.has_attr("href") else None
-
-        publisher = {
-            "name": publisher_name,
-            "url": publisher_url
-        }
-
-
-        # Я думаю полностью скипать DLC к платным играм, так как стим уведомит о скидке что в желаемом.
-        # Если что позже можно будет добавить такую функциональность
-        dlc_tag = soup.find("div", class_="game_area_bubble game_area_dlc_bubble")
-        dlc = dict()
-        if dlc_tag:
-            dlc_url = dlc_tag.find("a")["href"]
-            dlc_app_id = dlc_url.split("/")[-2]
-
-            dlc_name_tag = dlc_tag.find("a")
-            dlc_name = dlc_name_tag.text.strip()
-
-            logger.debug(f"{title} DLC к игре {dlc_name}")
-
-            res = requests.get(
-                dlc_url, 
-                headers=headers,
-                timeout=10)
-            logger.debug(f'Ответ {res.status_code}')
-            soup = BS(res.text, "lxml")
-
-            price_tag = soup.find("div", class_="game_purchase_price price")
-            price = price_tag.text.strip() if price_tag else None
-
-            btn = soup.find("div", id="freeGameBtn")
-
-            if btn:
-                price = 0
-            elif price:
-                price = re.search(r'[\d,.]+', price).group()
-                price = float(price.replace(",", ".").replace(" ", ""))
-
-            if price > 0:
-                logger.debug(f"Цена игры {title} к которой прикреплен DLC: {price}")
-                continue
-
-            dlc = {
-            "app_id": dlc_app_id,
-            "name": dlc_name,
-            "url": dlc_url,
-            "price": price
-            }
+    listing = []
+    try:
+        for region in regions:
+            cc = region["cc"] if region else ""
+            async for row in iter_search_rows(fetcher, parser, config["page_size"], region):
+                listing.append([cc, row["app_id"]] + [row[field] for field in LISTING_FIELDS])
+    except Exception as e:
+        logger.warning(f"Проверка выдачи не удалась: {e}")
+        return None, None
+
+    listing.sort(key=json.dumps)
+    fingerprint = hashlib.sha256(json.dumps(listing, ensure_ascii=False).encode("utf-8")).hexdigest()
+    return fingerprint, {item[1] for item in listing}
 
+
+@logger.catch
+async def get_games(known_games=None, config=None, regions=None, emit=None, skipped=None):
+    """Собираем бесплатные игры из поиска.
+    known_games - уже сохранённые игры, в инкрементальном режиме их страницы повторно не качаются.
+    config - конфиг коллектора, по умолчанию читается из config/collector_config.json.
+    regions - список регионов [{"cc": "ua", "l": "english"}, ...], по умолчанию из конфига.
+        Поиск по регионам идёт параллельно, страница игры качается один раз,
+        а цены каждого региона сохраняются в поле "regions".
+    emit - asyncio.Queue для режима конвейера: каждая новая или изменившаяся игра кладётся туда
+        парой (app_id, info) сразу после разбора её страницы.
+    skipped - множество, куда добавляются app_id, отброшенные намеренно (ДЛС к платной игре)
+        или отложенные после park_after_attempts неудач подряд. Их нет в результате и в базе, но запуск это не держит.
+    """
+    config = config or load_config()
+    fetcher = build_fetcher(config)
+    parser = get_parser(config["parser"])
+    regions = regions or config["regions"] or [None]
+
+    known_games = known_games if config["incremental"] and known_games else {}
+    failed_before = load_failed(config["failed_queue"])
+    rows = dict()
+    tasks = dict()
+    reused = dict()
+    region_prices = dict()
+
+    async def fetch_game(row):
+        game_info = await processing_game(fetcher, parser, row)
+        if game_info and emit is not None:
+            await emit.put((row["app_id"], game_info))
+        return game_info
+
+    def on_row(row, region):
+        app_id = row["app_id"]
+        if region:
+            region_prices.setdefault(app_id, {})[region["cc"]] = {field: row[field] for field in LISTING_FIELDS}
+
+        # Между страницами и регионами игра может попасться несколько раз
+        if app_id in rows:
+            return
+        rows[app_id] = row
+
+        known = known_games.get(app_id)
+        if known and not listing_changed(row, known, region) and app_id not in failed_before:
+            # Игра уже есть в базе и в выдаче ничего не поменялось - обновляем только поля выдачи
+            reused[app_id] = {**known, **{k: v for k, v in row.items() if k != "app_id"}}
         else:
-            dlc = None
-
-        games_list[app_id] = {
-            "name": title,
-            "url": url,
-            "image": image,
-            "description": description,
-            "discounted_price": discounted_price,
-            "currency_symbol": currency_symbol,
-            "original_price": original_price,
-            "developer": developer,
-            "publisher": publisher,
-            "release_date": release_date,
-            "recent_reviews": review_count,
-            "recent_summary": review_summary,
-            "dlc": dlc,
-            "status": "new"
-        }
-
-        time.sleep(2)
-
-        logger.info(f"✅ Обработана: {title} | Рейтинг: {review_summary} ({review_count} отз.)")
-        logger.debug(f"Информация о игре: {games_list[app_id]}\n{"="*100}")
+            # Страницу игры начинаем качать сразу, не дожидаясь остальных страниц поиска
+            tasks[app_id] = asyncio.create_task(fetch_game(row))
+
+    async def search_region(region):
+        async for row in iter_search_rows(fetcher, parser, config["page_size"], region):
+            on_row(row, region)
+
+    search_results = await asyncio.gather(*(search_region(region) for region in regions), return_exceptions=True)
+    search_complete = True
+    for region, result in zip(regions, search_results):
+        if isinstance(result, Exception):
+            # Уже найденные игры не теряем, обрабатываем то, что успели получить
+            search_complete = False
+            region_name = region["cc"] if region else "по умолчанию"
+            logger.error(f"Поиск (регион {region_name}) прерван: {result}. Продолжаем с {len(rows)} найденными играми.")
+
+    if not rows:
+        if search_complete:
+            logger.info("Сейчас нету бесплатных игр!")
+        return dict()
+
+    logger.info(f"Получено {len(rows)} игр из поиска. Новых или изменившихся: {len(tasks)}, без изменений: {len(reused)}.")
+
+    # Страницы игр качаются параллельно, частоту ограничивает fetcher.
+    # Ошибка одной игры не роняет остальные - она уходит в очередь повторов.
+    results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+    if fetcher.limiter:
+        logger.info(f"🚦 Итоговая скорость запросов: {fetcher.limiter.describe()}")
+
+    fetched = dict()
+    failed = dict()
+    for app_id, result in zip(tasks, results):
+        if isinstance(result, Exception):
+            attempts = failed_before.get(app_id, {}).get("attempts", 0) + 1
+            failed[app_id] = {"name": rows[app_id]["name"], "attempts": attempts, "error": repr(result)}
+            logger.opt(exception=result).debug(f"Ошибка обработки {app_id}")
+            if is_parked(attempts, config["park_after_attempts"]):
+                logger.warning(f"Не удалось обработать {failed[app_id]['name']} ({app_id}) {attempts} раз подряд: {result}. "
+                               f"Отложена до следующего полного запуска.")
+                # Отложенная игра не мешает запомнить отпечаток выдачи
+                if skipped is not None:
+                    skipped.add(app_id)
+            else:
+                logger.warning(f"Не удалось обработать {failed[app_id]['name']} ({app_id}): {result}. Повторим в следующем цикле.")
+        elif result:
+            fetched[app_id] = result
+        elif skipped is not None:
+            skipped.add(app_id)
+
+    if not search_complete:
+        # До непросмотренных игр из старой очереди дело не дошло - оставляем их в очереди
+        failed.update({app_id: info for app_id, info in failed_before.items() if app_id not in rows})
+
+    if failed or failed_before:
+        save_failed(failed, config["failed_queue"])
+    if failed:
+        logger.warning(f"В очереди повторов {len(failed)} игр.")
+
+    # Сохраняем порядок выдачи
+    games_list = dict()
+    for app_id in rows:
+        if app_id in reused:
+            games_list[app_id] = reused[app_id]
+        elif app_id in fetched:
+            games_list[app_id] = fetched[app_id]
 
+        if app_id in games_list and region_prices:
+            games_list[app_id]["regions"] = region_prices.get(app_id, {})
 
     return games_list
 
 
 if __name__ == "__main__":
-    games_list = get_games()
-    print(games_list)
\ No newline at end of file
+    games_list = asyncio.run(get_games())
+    print(games_list)
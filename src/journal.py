@@ -0,0 +1,60 @@
+import json
+import os
+import time
+from pathlib import Path
+from loguru import logger
+
+
+JOURNAL_PATH = Path("data") / "status.journal"
+
+
+class StatusJournal:
+    """Журнал смены статусов игр: одна строка JSON на изменение, дописывается и сбрасывается на диск (fsync) сразу.
+    Если сбор упал посередине, при следующем запуске журнал проигрывается в хранилище
+    и уже забранные игры повторно в браузере не открываются.
+    """
+
+    def __init__(self, path=JOURNAL_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def append(self, app_id, status):
+        record = {"app_id": app_id, "status": status, "ts": time.time()}
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def records(self):
+        """Записи журнала по порядку. Недописанную при падении последнюю строку пропускаем"""
+        if not self.path.exists():
+            return []
+
+        records = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning(f"Пропущена битая запись журнала: {line.strip()[:100]}")
+        return records
+
+    def replay(self, store):
+        """Применяем журнал к хранилищу и очищаем его. Возвращает число применённых записей"""
+        records = self.records()
+        if not records:
+            return 0
+
+        # Последняя запись по игре - актуальная
+        statuses = {record["app_id"]: record["status"] for record in records}
+        for app_id, status in statuses.items():
+            store.set_status(app_id, status)
+
+        self.truncate()
+        logger.info(f"📓 Восстановлено статусов из журнала: {len(statuses)}")
+        return len(statuses)
+
+    def truncate(self):
+        """Статусы уже в хранилище - журнал больше не нужен"""
+        if self.path.exists():
+            self.path.unlink()
@@ -0,0 +1,122 @@
+from enum import Enum
+
+
+class Game:
+    """Запись об игре. __slots__ вместо словаря: меньше памяти на запись и опечатка в поле сразу даёт ошибку.
+    Смена статуса сообщается коллекции, чтобы её индекс по статусам оставался актуальным.
+    """
+
+    FIELDS = (
+        "name", "url", "image", "description", "discounted_price", "currency_symbol", "original_price",
+        "developer", "publisher", "release_date", "recent_reviews", "recent_summary", "dlc", "regions",
+        "collect_attempts",
+    )
+
+    __slots__ = ("app_id", "_status", "_collection", "extra") + FIELDS
+
+    def __init__(self, app_id, status="new", extra=None, **fields):
+        self.app_id = app_id
+        self._status = status
+        self._collection = None
+        # Поля, которых нет в FIELDS (например из старых версий games.json), сохраняем как есть
+        self.extra = extra or None
+        for field in self.FIELDS:
+            setattr(self, field, fields.get(field))
+
+    @property
+    def status(self):
+        return self._status
+
+    @status.setter
+    def status(self, value):
+        old = self._status
+        self._status = value
+        if self._collection is not None and old != value:
+            self._collection._move(self, old, value)
+
+    @classmethod
+    def from_dict(cls, app_id, data):
+        fields = {k: v for k, v in data.items() if k in cls.FIELDS}
+        extra = {k: v for k, v in data.items() if k not in cls.FIELDS and k != "status"}
+        return cls(app_id, status=data.get("status", "new"), extra=extra, **fields)
+
+    def to_dict(self):
+        data = {field: getattr(self, field) for field in self.FIELDS}
+        # regions есть только при поиске по нескольким регионам, collect_attempts - только после неудачного сбора
+        for field in ("regions", "collect_attempts"):
+            if data[field] is None:
+                del data[field]
+        if self.extra:
+            data.update(self.extra)
+        data["status"] = self._status
+        return data
+
+    def __repr__(self):
+        return f"Game({self.app_id!r}, {self.name!r}, status={self._status!r})"
+
+
+class GameCollection:
+    """Набор игр с индексом по статусу: подсчёт и перебор игр с нужным статусом - O(таких игр), а не O(всех)"""
+
+    def __init__(self, games=()):
+        self._games = {}
+        self._by_status = {}
+        for game in games:
+            self.add(game)
+
+    @classmethod
+    def from_dict(cls, games_list):
+        return cls(Game.from_dict(app_id, data) for app_id, data in games_list.items())
+
+    def to_dict(self):
+        return {app_id: game.to_dict() for app_id, game in self._games.items()}
+
+    def add(self, game):
+        old = self._games.get(game.app_id)
+        if old is not None:
+            self._by_status[old.status].pop(old.app_id, None)
+            old._collection = None
+
+        game._collection = self
+        self._games[game.app_id] = game
+        self._by_status.setdefault(game.status, {})[game.app_id] = game
+
+    def _move(self, game, old, new):
+        self._by_status.get(old, {}).pop(game.app_id, None)
+        self._by_status.setdefault(new, {})[game.app_id] = game
+
+    def get(self, app_id, default=None):
+        return self._games.get(app_id, default)
+
+    def count(self, status):
+        return len(self._by_status.get(status, ()))
+
+    def with_status(self, status):
+        """Снимок игр с нужным статусом: статусы можно менять прямо во время перебора"""
+        return list(self._by_status.get(status, {}).values())
+
+    def __len__(self):
+        return len(self._games)
+
+    def __iter__(self):
+        return iter(self._games.values())
+
+    def __contains__(self, app_id):
+        return app_id in self._games
+
+
+class CollectResult(str, Enum):
+    """Итог попытки забрать игру"""
+    COLLECTED = "collected"          # Steam подтвердил добавление лицензии
+    OWNED = "owned"                  # Игра уже была в библиотеке
+    FAILED = "failed"                # Не дождались ответа или ошибка - попробуем в следующий раз
+    UNAVAILABLE = "unavailable"      # Страницы нет или игра недоступна в регионе
+
+
+# Статус игры в базе по итогу попытки. При FAILED игра остаётся new и попадёт в следующий запуск
+STATUS_BY_RESULT = {
+    CollectResult.COLLECTED: "collected",
+    CollectResult.OWNED: "collected",
+    CollectResult.UNAVAILABLE: "unavailable",
+    CollectResult.FAILED: "new",
+}
@@ -0,0 +1,344 @@
+import re
+from bs4 import BeautifulSoup as BS
+from lxml import etree
+from lxml import html as lxml_html
+from loguru import logger
+
+
+def parse_price(price_text):
+    """Достаём число из строки цены: '99,00₴' -> 99.0"""
+    price = re.search(r'[\d,.]+', price_text).group()
+    return float(price.replace(",", ".").replace(" ", ""))
+
+
+def parse_discounted_price(price_text):
+    """Цена со скидкой и символ валюты из строки выдачи поиска"""
+    discounted_price = 0
+    currency_symbol = "?"
+    if price_text and len(price_text) > 1:
+        currency_symbol = price_text[-1]
+        try:
+            discounted_price = parse_price(price_text)
+        except (ValueError, AttributeError):
+            logger.warning(f"Не удалось распарсить цену: {price_text}")
+    return discounted_price, currency_symbol
+
+
+def parse_review_count(review_count_text):
+    try:
+        return int(review_count_text.strip("()").replace(",", "").replace(" ", ""))
+    except Exception as e:
+        logger.debug(f"Недостаточно обзоров для расчета рейтинга: Ошибка: {e}")
+        return None
+
+
+def parse_app_id(url):
+    """Числовой app_id из ссылки магазина: .../app/1794680/Vampire_Survivors/ -> '1794680'"""
+    match = re.search(r"/app/(\d+)", url or "")
+    return match.group(1) if match else None
+
+
+class BS4Parser:
+    """Разбор страниц Steam через BeautifulSoup по всему документу"""
+
+    name = "bs4"
+
+    def search_rows(self, results_html):
+        """Строки выдачи поиска -> список словарей с полями выдачи"""
+        soup = BS(results_html, "lxml")
+        rows = []
+        for game in soup.find_all("a", class_="search_result_row"):
+            discounted_price_tag = game.find("div", class_="discount_final_price")
+            price_text = discounted_price_tag.text.strip() if discounted_price_tag else None
+            discounted_price, currency_symbol = parse_discounted_price(price_text)
+
+            orig_price_tag = game.find("div", class_="discount_original_price")
+
+            rows.append({
+                "app_id": game["data-ds-appid"],
+                "name": game.find("span", class_="title").text,
+                "url": game.get("href"),
+                "image": game.find("div", class_="search_capsule").find("img").get("src"),
+                "discounted_price": discounted_price,
+                "currency_symbol": currency_symbol,
+                "original_price": orig_price_tag.text.strip() if orig_price_tag else None,
+            })
+        return rows
+
+    def app_page(self, page_html):
+        """Страница игры -> описание, отзывы, дата, разработчик, издатель и ссылка на родительскую игру DLC"""
+        soup = BS(page_html, "lxml")
+
+        desc_tag = soup.find("div", class_="game_description_snippet")
+        description = desc_tag.text.strip() if desc_tag else None
+
+        # Просто перешли в удобный блок для дальнейшей разборки
+        mini_div_info = soup.find("div", class_="glance_ctn_responsive_left")
+
+        user_reviews = mini_div_info.find("div", id="userReviews") # блок с впечатлениями и отзывами
+        review_summary = None
+        review_count = None
+        if user_reviews:
+            recent_reviews_row = user_reviews.find("div", class_="summary column")
+            review = recent_reviews_row.find_all("span")
+
+            if review:
+                review_summary = review[0].text.strip()
+                review_count = parse_review_count(review[1].text.strip()) if len(review) > 1 else None
+
+        release_date_tag = mini_div_info.find("div", class_="date")
+        release_date = release_date_tag.text.strip() if release_date_tag else None
+
+        developer_div = mini_div_info.find("div", id="developers_list")
+        developer_link = developer_div.find("a") if developer_div else None
+        developer = None
+        if developer_link:
+            developer = {
+                "name": developer_link.text.strip(),
+                "url": developer_link.get("href", "")
+            }
+
+        publisher_tag = mini_div_info.find_all("div", class_="dev_row")[-1]
+        publisher_name = None
+        publisher_url = None
+        if publisher_tag:
+            publisher_link = publisher_tag.find("a")
+            publisher_name = publisher_link.text.strip() if publisher_link else None
+            publisher_url = publisher_link["href"] if publisher_link and publisher_link.has_attr("href") else None
+
+        dlc_tag = soup.find("div", class_="game_area_bubble game_area_dlc_bubble")
+        dlc_parent = None
+        if dlc_tag:
+            dlc_url = dlc_tag.find("a")["href"]
+            dlc_parent = {
+                "app_id": parse_app_id(dlc_url),
+                "name": dlc_tag.find("a").text.strip(),
+                "url": dlc_url,
+            }
+
+        return {
+            "description": description,
+            "recent_reviews": review_count,
+            "recent_summary": review_summary,
+            "release_date": release_date,
+            "developer": developer,
+            "publisher": {"name": publisher_name, "url": publisher_url},
+            "has_reviews": bool(user_reviews),
+            "dlc_parent": dlc_parent,
+        }
+
+    def dlc_parent_price(self, page_html):
+        """Цена родительской игры DLC: 0 если раздаётся бесплатно, None если цену не нашли"""
+        soup = BS(page_html, "lxml")
+
+        price_tag = soup.find("div", class_="game_purchase_price price")
+        price = price_tag.text.strip() if price_tag else None
+
+        if soup.find("div", id="freeGameBtn"):
+            return 0
+        if price:
+            return parse_price(price)
+        return None
+
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+class LxmlParser:
+    """Разбор страниц Steam через lxml и заранее скомпилированные XPath.
+    На странице игры разбираются только нужные участки HTML, а не весь документ.
+    """
+
+    name = "lxml"
+
+    # Размер участка HTML, который разбираем начиная с найденного блока
+    RE_DIV_TAG = re.compile(r"<(/?)div\b", re.IGNORECASE)
+    REGION_SIZE = {
+        "game_description_snippet": 4096,
+        "glance_ctn_responsive_left": 16384,
+        "game_area_dlc_bubble": 4096,
+        "game_purchase_price": 2048,
+        "freeGameBtn": 2048,
+    }
+
+    X_ROWS = etree.XPath(f"//a[{_has_class('search_result_row')}]")
+    X_TITLE = etree.XPath(f".//span[{_has_class('title')}]")
+    X_FINAL_PRICE = etree.XPath(f".//div[{_has_class('discount_final_price')}]")
+    X_ORIG_PRICE = etree.XPath(f".//div[{_has_class('discount_original_price')}]")
+    X_CAPSULE_IMG = etree.XPath(f".//div[{_has_class('search_capsule')}]//img")
+
+    X_DESCRIPTION = etree.XPath(f"//div[{_has_class('game_description_snippet')}]")
+    X_GLANCE = etree.XPath(f"//div[{_has_class('glance_ctn_responsive_left')}]")
+    X_USER_REVIEWS = etree.XPath(".//div[@id='userReviews']")
+    X_SUMMARY = etree.XPath(".//div[normalize-space(@class)='summary column']")
+    X_SPANS = etree.XPath(".//span")
+    X_DATE = etree.XPath(f".//div[{_has_class('date')}]")
+    X_DEVELOPERS = etree.XPath(".//div[@id='developers_list']")
+    X_DEV_ROWS = etree.XPath(f".//div[{_has_class('dev_row')}]")
+    X_LINK = etree.XPath(".//a")
+    X_DLC_BUBBLE = etree.XPath("//div[normalize-space(@class)='game_area_bubble game_area_dlc_bubble']")
+
+    X_PURCHASE_PRICE = etree.XPath("//div[normalize-space(@class)='game_purchase_price price']")
+    X_FREE_BTN = etree.XPath("//div[@id='freeGameBtn']")
+
+    @staticmethod
+    def _first(xpath, node):
+        found = xpath(node) if node is not None else []
+        return found[0] if found else None
+
+    @staticmethod
+    def _text(node):
+        return node.text_content().strip() if node is not None else None
+
+    def _block_end(self, chunk, marker):
+        """Конец блока (после его закрывающего </div>) внутри куска.
+        Если блок не поместился в кусок, обрезанный HTML молча дал бы неверные поля (например
+        разработчика вместо издателя) - бросаем исключение, чтобы FallbackParser разобрал страницу через bs4.
+        """
+        depth = 0
+        for match in self.RE_DIV_TAG.finditer(chunk):
+            depth += -1 if match.group(1) else 1
+            if depth == 0:
+                return chunk.find(">", match.end()) + 1 or len(chunk)
+        raise ValueError(f"Блок {marker} не поместился в {self.REGION_SIZE[marker]} байт")
+
+    def _region(self, page_html, marker):
+        """Находим тег, у которого в атрибутах есть marker, и разбираем только кусок HTML начиная с него.
+        Если такого тега нет - блока на странице нет, возвращаем None.
+        """
+        pos = page_html.find(marker)
+        while pos != -1:
+            tag_start = page_html.rfind("<", 0, pos)
+            # marker должен быть внутри открывающего тега, а не в тексте или скриптах
+            if tag_start != -1 and page_html.rfind(">", tag_start, pos) == -1 and page_html.startswith("<div", tag_start):
+                chunk = page_html[tag_start:tag_start + self.REGION_SIZE[marker]]
+                return lxml_html.document_fromstring(chunk[:self._block_end(chunk, marker)])
+            pos = page_html.find(marker, pos + len(marker))
+        return None
+
+    def search_rows(self, results_html):
+        if not results_html.strip():
+            return []
+
+        root = lxml_html.document_fromstring(results_html)
+        rows = []
+        for game in self.X_ROWS(root):
+            discounted_price, currency_symbol = parse_discounted_price(self._text(self._first(self.X_FINAL_PRICE, game)))
+            image = self._first(self.X_CAPSULE_IMG, game)
+
+            rows.append({
+                "app_id": game.attrib["data-ds-appid"],
+                "name": self._first(self.X_TITLE, game).text_content(),
+                "url": game.get("href"),
+                "image": image.get("src") if image is not None else None,
+                "discounted_price": discounted_price,
+                "currency_symbol": currency_symbol,
+                "original_price": self._text(self._first(self.X_ORIG_PRICE, game)),
+            })
+        return rows
+
+    def app_page(self, page_html):
+        description = self._text(self._first(self.X_DESCRIPTION, self._region(page_html, "game_description_snippet")))
+
+        mini_div_info = self._first(self.X_GLANCE, self._region(page_html, "glance_ctn_responsive_left"))
+        if mini_div_info is None:
+            raise ValueError("На странице нет блока glance_ctn_responsive_left")
+
+        user_reviews = self._first(self.X_USER_REVIEWS, mini_div_info)
+        review_summary = None
+        review_count = None
+        if user_reviews is not None:
+            review = self.X_SPANS(self._first(self.X_SUMMARY, user_reviews))
+            if review:
+                review_summary = self._text(review[0])
+                review_count = parse_review_count(self._text(review[1])) if len(review) > 1 else None
+
+        release_date = self._text(self._first(self.X_DATE, mini_div_info))
+
+        developer_link = self._first(self.X_LINK, self._first(self.X_DEVELOPERS, mini_div_info))
+        developer = None
+        if developer_link is not None:
+            developer = {
+                "name": self._text(developer_link),
+                "url": developer_link.get("href", "")
+            }
+
+        dev_rows = self.X_DEV_ROWS(mini_div_info)
+        publisher_link = self._first(self.X_LINK, dev_rows[-1]) if dev_rows else None
+
+        dlc_tag = self._first(self.X_DLC_BUBBLE, self._region(page_html, "game_area_dlc_bubble"))
+        dlc_parent = None
+        if dlc_tag is not None:
+            dlc_link = self._first(self.X_LINK, dlc_tag)
+            dlc_url = dlc_link.attrib["href"]
+            dlc_parent = {
+                "app_id": parse_app_id(dlc_url),
+                "name": self._text(dlc_link),
+                "url": dlc_url,
+            }
+
+        return {
+            "description": description,
+            "recent_reviews": review_count,
+            "recent_summary": review_summary,
+            "release_date": release_date,
+            "developer": developer,
+            "publisher": {
+                "name": self._text(publisher_link),
+                "url": publisher_link.get("href") if publisher_link is not None else None,
+            },
+            "has_reviews": user_reviews is not None,
+            "dlc_parent": dlc_parent,
+        }
+
+    def dlc_parent_price(self, page_html):
+        if self._first(self.X_FREE_BTN, self._region(page_html, "freeGameBtn")) is not None:
+            return 0
+
+        price = self._text(self._first(self.X_PURCHASE_PRICE, self._region(page_html, "game_purchase_price")))
+        if price:
+            return parse_price(price)
+        return None
+
+
+class FallbackParser:
+    """Пробуем быстрый парсер, при ошибке разбираем ту же страницу запасным"""
+
+    def __init__(self, primary, fallback):
+        self.primary = primary
+        self.fallback = fallback
+        self.name = f"{primary.name}+{fallback.name}"
+
+    def _call(self, method, page_html):
+        try:
+            return getattr(self.primary, method)(page_html)
+        except Exception as e:
+            logger.debug(f"Парсер {self.primary.name} не справился ({method}): {e}. Пробуем {self.fallback.name}")
+            return getattr(self.fallback, method)(page_html)
+
+    def search_rows(self, results_html):
+        return self._call("search_rows", results_html)
+
+    def app_page(self, page_html):
+        return self._call("app_page", page_html)
+
+    def dlc_parent_price(self, page_html):
+        return self._call("dlc_parent_price", page_html)
+
+
+PARSERS = {
+    "lxml": LxmlParser,
+    "bs4": BS4Parser,
+}
+
+
+def get_parser(name="lxml"):
+    """Парсер по имени из конфига. lxml подстрахован BeautifulSoup"""
+    if name not in PARSERS:
+        logger.warning(f"Неизвестный парсер {name}, используем bs4")
+        name = "bs4"
+
+    if name == "bs4":
+        return BS4Parser()
+    return FallbackParser(PARSERS[name](), BS4Parser())
@@ -0,0 +1,161 @@
+import asyncio
+import json
+from pathlib import Path
+from urllib.parse import urljoin
+from loguru import logger
+from lxml import html as lxml_html
+from requests.cookies import RequestsCookieJar
+from src.models import CollectResult
+from src.utils.chrome_manager import ChromeManager
+from src.utils.files import atomic_write_json
+from src.utils.http_session import build_session
+
+
+STORE_URL = "https://store.steampowered.com"
+USERDATA_URL = f"{STORE_URL}/dynamicstore/userdata/"
+COOKIES_FILE = "collector_cookies.json"  # Лежит в папке профиля Chrome рядом с его собственными куками
+
+
+def cookies_path():
+    return Path(ChromeManager().config["user_data_dir"]) / COOKIES_FILE
+
+
+async def save_cookies(context, path=None):
+    """Выгружаем куки магазина из авторизованного браузера, чтобы следующие запуски ходили в Steam без Chrome"""
+    path = path or cookies_path()
+    cookies = await context.cookies([STORE_URL])
+    if not any(cookie["name"] == "steamLoginSecure" for cookie in cookies):
+        return 0
+    await asyncio.to_thread(atomic_write_json, path, cookies)
+    logger.debug(f"🍪 Сохранили куки Steam: {len(cookies)} -> {path}")
+    return len(cookies)
+
+
+def load_cookies(path=None):
+    """Куки авторизации в виде RequestsCookieJar или None, если их ещё не выгружали"""
+    path = path or cookies_path()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cookies = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+    jar = RequestsCookieJar()
+    for cookie in cookies:
+        jar.set(
+            cookie["name"], cookie["value"],
+            domain=cookie["domain"],
+            path=cookie.get("path", "/"),
+            # У сессионных кук Playwright пишет expires = -1
+            expires=cookie["expires"] if (cookie.get("expires") or -1) > 0 else None,
+            secure=cookie.get("secure", False),
+        )
+    return jar
+
+
+def _cookie_list(jar):
+    return [
+        {"name": c.name, "value": c.value, "domain": c.domain, "path": c.path, "expires": c.expires or -1, "secure": c.secure}
+        for c in jar
+    ]
+
+
+def account_session(path=None):
+    """Отдельная HTTP сессия с куками аккаунта или None, если куки ещё не выгружали.
+    Не общая сессия коллектора: Set-Cookie из ответов Steam попадают в банку сессии,
+    а поиск и страницы игр (и их кэш) должны оставаться анонимными.
+    """
+    path = path or cookies_path()
+    jar = load_cookies(path)
+    if jar is None:
+        return None
+
+    session = build_session(pool_size=2)
+    session.cookies = jar
+    session.cookies_path = path
+    session.saved_cookies = _cookie_list(jar)
+    return session
+
+
+def sync_cookies(session):
+    """Steam продлевает авторизацию через Set-Cookie (например новый steamLoginSecure) - сохраняем обновлённые куки"""
+    cookies = _cookie_list(session.cookies)
+    if cookies != session.saved_cookies:
+        atomic_write_json(session.cookies_path, cookies)
+        session.saved_cookies = cookies
+        logger.debug(f"🍪 Steam обновил куки, сохранили в {session.cookies_path}")
+
+
+def fetch_owned_apps(session, timeout=10):
+    """Все app_id из библиотеки аккаунта одним запросом (dynamicstore/userdata).
+    None - куки устарели или Steam не ответил: тогда владение проверит браузер.
+    """
+    try:
+        response = session.get(USERDATA_URL, timeout=timeout)
+        response.raise_for_status()
+        data = response.json()
+    except Exception as e:
+        logger.warning(f"Не удалось получить библиотеку аккаунта: {e}")
+        return None
+    finally:
+        sync_cookies(session)
+
+    owned_apps = data.get("rgOwnedApps") or []
+    # Без авторизации Steam отвечает пустыми списками
+    if not owned_apps and not data.get("rgOwnedPackages"):
+        logger.warning("Куки Steam устарели, библиотеку проверит браузер.")
+        return None
+
+    return {str(app_id) for app_id in owned_apps}
+
+
+def find_license_form(html):
+    """Форма бесплатной лицензии со страницы игры: (action, скрытые поля) или None.
+    Кнопка "добавить в библиотеку" (javascript:addToCart) просто отправляет эту форму.
+    """
+    tree = lxml_html.fromstring(html)
+    forms = tree.xpath('//form[contains(@action, "addfreelicense")]')
+    if not forms:
+        return None
+    form = forms[0]
+    fields = {field.get("name"): field.get("value", "") for field in form.xpath('.//input[@name]')}
+    return form.get("action"), fields
+
+
+def claim_free_license(session, app_id, url, timeout=10):
+    """Забираем игру без браузера: открываем страницу с куками аккаунта и отправляем форму лицензии.
+    Возвращает CollectResult или None, если страница требует JS (проверка возраста, нет формы) -
+    тогда игру заберёт браузер. COLLECTED здесь значит "Steam принял запрос", владение проверяется отдельно.
+    """
+    try:
+        return _claim_free_license(session, app_id, url, timeout)
+    finally:
+        sync_cookies(session)
+
+
+def _claim_free_license(session, app_id, url, timeout):
+    # Не cookies.get: sessionid может лежать сразу под несколькими доменами
+    sessionid = next((cookie.value for cookie in session.cookies if cookie.name == "sessionid"), None)
+    if not sessionid:
+        return None
+
+    response = session.get(url, timeout=timeout)
+    if response.status_code != 200 or "agecheck" in response.url:
+        return None
+    # Steam уводит с удалённых и закрытых для региона игр на главную
+    if f"/app/{app_id}" not in response.url:
+        return CollectResult.UNAVAILABLE
+    if "game_area_already_owned" in response.text:
+        return CollectResult.OWNED
+
+    form = find_license_form(response.text)
+    if form is None:
+        return None
+    action, fields = form
+    fields["sessionid"] = sessionid
+
+    response = session.post(urljoin(response.url, action), data=fields, timeout=timeout)
+    if not response.ok or 'id="error_box"' in response.text:
+        logger.warning(f"Steam отклонил запрос лицензии для app_id: {app_id} ({response.status_code}).")
+        return None
+    return CollectResult.COLLECTED
@@ -0,0 +1,193 @@
+import json
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from loguru import logger
+from src.utils.files import atomic_write_json
+
+
+DB_PATH = Path("data") / "games.db"
+JSON_PATH = Path("data") / "games.json"
+
+
+class GameStore:
+    """Хранилище игр во встроенной SQLite вместо одного большого games.json.
+    Статус лежит в отдельной индексированной колонке, остальная информация об игре - JSON в колонке data.
+    """
+
+    def __init__(self, db_path=DB_PATH, json_path=JSON_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+        # Первый запуск после перехода на SQLite - переносим старый games.json
+        if not len(self) and json_path and Path(json_path).exists():
+            count = self.import_json(json_path)
+            logger.info(f"📦 Импортировано {count} игр из {json_path} в {self.db_path}")
+
+    def _create_schema(self):
+        with self.conn:
+            # app_id - PRIMARY KEY, по нему SQLite сам строит уникальный индекс
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS games (
+                    app_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL DEFAULT 'new',
+                    data TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    last_seen REAL NOT NULL DEFAULT 0
+                )
+            """)
+            # Базы, созданные до появления last_seen
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(games)")]
+            if "last_seen" not in columns:
+                self.conn.execute("ALTER TABLE games ADD COLUMN last_seen REAL NOT NULL DEFAULT 0")
+                self.conn.execute("UPDATE games SET last_seen = updated_at")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_games_status ON games(status)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_games_last_seen ON games(last_seen)")
+
+    @staticmethod
+    def _row_to_game(status, data):
+        game = json.loads(data)
+        game["status"] = status
+        return game
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+
+    def __contains__(self, app_id):
+        return self.conn.execute("SELECT 1 FROM games WHERE app_id = ?", (app_id,)).fetchone() is not None
+
+    def get(self, app_id, default=None):
+        """Одна игра по app_id или default. Вместе с __len__ позволяет передавать хранилище вместо словаря"""
+        row = self.conn.execute("SELECT status, data FROM games WHERE app_id = ?", (app_id,)).fetchone()
+        return self._row_to_game(*row) if row else default
+
+    def get_all(self):
+        rows = self.conn.execute("SELECT app_id, status, data FROM games ORDER BY rowid")
+        return {app_id: self._row_to_game(status, data) for app_id, status, data in rows}
+
+    def get_by_status(self, status):
+        """Игры с нужным статусом, выборка по индексу"""
+        rows = self.conn.execute("SELECT app_id, status, data FROM games WHERE status = ? ORDER BY rowid", (status,))
+        return {app_id: self._row_to_game(status, data) for app_id, status, data in rows}
+
+    def count_by_status(self, status):
+        return self.conn.execute("SELECT COUNT(*) FROM games WHERE status = ?", (status,)).fetchone()[0]
+
+    def statuses(self, app_ids):
+        """Статусы уже известных игр из списка app_ids"""
+        app_ids = list(app_ids)
+        result = {}
+        # Ограничение SQLite на число параметров в запросе
+        for i in range(0, len(app_ids), 500):
+            chunk = app_ids[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(f"SELECT app_id, status FROM games WHERE app_id IN ({placeholders})", chunk)
+            result.update(rows)
+        return result
+
+    def upsert_many(self, games, seen=False):
+        """Вставляем или обновляем игры одной транзакцией.
+        seen=True - игры только что были в выдаче, обновляем last_seen (по нему работает архивация).
+        """
+        now = time.time()
+        params = []
+        for app_id, info in games.items():
+            data = {k: v for k, v in info.items() if k != "status"}
+            params.append((app_id, info.get("status", "new"), json.dumps(data, ensure_ascii=False), now, now))
+
+        last_seen = "excluded.last_seen" if seen else "games.last_seen"
+        with self.conn:
+            self.conn.executemany(f"""
+                INSERT INTO games (app_id, status, data, updated_at, last_seen) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(app_id) DO UPDATE SET
+                    status = excluded.status,
+                    data = excluded.data,
+                    updated_at = excluded.updated_at,
+                    last_seen = {last_seen}
+            """, params)
+
+    def set_status(self, app_id, status):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE games SET status = ?, updated_at = ? WHERE app_id = ?",
+                (status, time.time(), app_id)
+            )
+
+    def merge_scraped(self, games_list, archived=None):
+        """Сохраняем свежий результат коллектора: известные игры сохраняют статус, новые получают 'new'.
+        archived - статусы игр из архива, если игра снова появилась в выдаче.
+        """
+        known = self.statuses(games_list)
+        archived = archived or {}
+        for app_id, info in games_list.items():
+            info["status"] = known.get(app_id) or archived.get(app_id, "new")
+        self.upsert_many(games_list, seen=True)
+        return games_list
+
+    def select_stale(self, seen_before):
+        """Игры, которых нет в выдаче с момента seen_before"""
+        rows = self.conn.execute(
+            "SELECT app_id, status, data, last_seen FROM games WHERE last_seen < ? ORDER BY rowid",
+            (seen_before,)
+        )
+        result = {}
+        for app_id, status, data, last_seen in rows:
+            game = self._row_to_game(status, data)
+            game["last_seen"] = last_seen
+            result[app_id] = game
+        return result
+
+    def delete_many(self, app_ids):
+        with self.conn:
+            self.conn.executemany("DELETE FROM games WHERE app_id = ?", ((app_id,) for app_id in app_ids))
+
+    def import_json(self, path=JSON_PATH):
+        with open(path, "r", encoding="utf-8") as f:
+            try:
+                games = json.load(f)
+            except json.JSONDecodeError:
+                logger.error(f"Файл {path} поврежден или пустой, импорт пропущен.")
+                return 0
+        self.upsert_many(games)
+        return len(games)
+
+    def export_json(self, path=JSON_PATH):
+        """Выгружаем базу в прежний формат games.json"""
+        games = self.get_all()
+        atomic_write_json(path, games)
+        return len(games)
+
+    def close(self):
+        self.conn.close()
+
+
+_store = None
+
+
+def get_store():
+    """Общее хранилище на весь процесс"""
+    global _store
+    if _store is None:
+        _store = GameStore()
+    return _store
+
+
+if __name__ == "__main__":
+    # python -m src.storage export [data/games.json]
+    # python -m src.storage import [data/games.json]
+    if len(sys.argv) < 2 or sys.argv[1] not in ("export", "import"):
+        print("Использование: python -m src.storage export|import [путь к json]")
+        sys.exit(1)
+
+    command = sys.argv[1]
+    path = sys.argv[2] if len(sys.argv) > 2 else JSON_PATH
+    store = GameStore(json_path=None)
+    if command == "export":
+        print(f"Выгружено игр: {store.export_json(path)} -> {path}")
+    else:
+        print(f"Загружено игр: {store.import_json(path)} <- {path}")
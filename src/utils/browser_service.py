@@ -0,0 +1,122 @@
+import asyncio
+from contextlib import asynccontextmanager
+from loguru import logger
+from src.utils.chrome_manager import ChromeManager
+
+
+class BrowserService:
+    """Долгоживущий Chrome, к которому подключаются авторизация и все запуски сбора.
+    Браузер стартует при первом обращении, проверяется перед каждым использованием
+    (при падении перезапускается) и закрывается после idle_timeout секунд простоя.
+    """
+
+    def __init__(self, idle_timeout=21600, config_path=None):
+        self.idle_timeout = idle_timeout
+        self.config_path = config_path
+        self.manager = None
+        self.starts = 0
+        self._users = 0
+        self._idle_handle = None
+        self._lock = asyncio.Lock()
+
+    async def _is_healthy(self):
+        manager = self.manager
+        if manager is None or manager.browser is None or manager.page is None:
+            return False
+        if manager.process is not None and manager.process.poll() is not None:
+            return False
+        if not manager.browser.is_connected() or manager.page.is_closed():
+            return False
+        try:
+            await asyncio.wait_for(manager.page.evaluate("1"), timeout=5)
+        except Exception:
+            return False
+        return True
+
+    async def _start(self):
+        self.manager = ChromeManager(self.config_path)
+        await self.manager.start()
+        self.starts += 1
+        logger.info(f"🧭 Браузерный сервис запущен (запуск №{self.starts})")
+
+    async def _stop(self):
+        if self.manager is not None:
+            manager, self.manager = self.manager, None
+            await manager.cleanup()
+            logger.info("🧭 Браузерный сервис остановлен")
+
+    async def _ensure_running(self):
+        if await self._is_healthy():
+            return
+        if self.manager is not None:
+            logger.warning("🧭 Браузер не отвечает, перезапускаем")
+            await self._stop()
+        await self._start()
+
+    def _schedule_idle_stop(self):
+        loop = asyncio.get_running_loop()
+        self._idle_handle = loop.call_later(self.idle_timeout, lambda: asyncio.ensure_future(self._idle_stop()))
+
+    def _cancel_idle_stop(self):
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+
+    async def _idle_stop(self):
+        async with self._lock:
+            if self._users == 0:
+                logger.debug(f"🧭 Браузер простаивал {self.idle_timeout} сек, закрываем")
+                await self._stop()
+
+    @asynccontextmanager
+    async def session(self):
+        """Выдаёт живой ChromeManager. После выхода браузер не закрывается, а ждёт следующего запуска"""
+        async with self._lock:
+            self._cancel_idle_stop()
+            await self._ensure_running()
+            self._users += 1
+        try:
+            yield self.manager
+        finally:
+            async with self._lock:
+                self._users -= 1
+                if self._users == 0:
+                    self._schedule_idle_stop()
+
+    async def close(self):
+        async with self._lock:
+            self._cancel_idle_stop()
+            await self._stop()
+
+
+_service = None
+
+
+def get_browser_service():
+    """Общий браузерный сервис, если он включён в chrome_config.json (browser_service.enabled), иначе None"""
+    global _service
+    if _service is None:
+        settings = ChromeManager().config.get("browser_service", {})
+        if not settings.get("enabled"):
+            return None
+        _service = BrowserService(idle_timeout=settings.get("idle_timeout", 21600))
+    return _service
+
+
+async def close_browser_service():
+    global _service
+    if _service is not None:
+        await _service.close()
+        _service = None
+
+
+@asynccontextmanager
+async def open_browser():
+    """Браузер для одного запуска: из сервиса, если он включён, иначе отдельный Chrome на время блока"""
+    service = get_browser_service()
+    if service is not None:
+        async with service.session() as manager:
+            yield manager
+    else:
+        async with ChromeManager() as manager:
+            yield manager
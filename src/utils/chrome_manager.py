@@ -1,16 +1,24 @@
 import asyncio
 import subprocess
 import psutil
-import socket
 import random
 import json
 import math
 import platform
+import signal
+import time
+import urllib.request
 from pathlib import Path
 from playwright.async_api import async_playwright
 from loguru import logger
 import os 
 import ctypes
+from src.utils.files import atomic_write_json
+from src.utils.resource_blocker import ResourceBlocker
+
+
+PID_FILE = "collector_chrome.pid"  # Лежит в папке профиля: PID, группа и время старта нашего Chrome
+
 
 class ChromeManager:
     """Управление Chrome через Playwright с возможностью имитации человеческого поведения"""
@@ -28,6 +36,9 @@ class ChromeManager:
         self.pw = None
         self.browser = None
         self.page = None
+        self.startup_time = None    # Сколько Chrome поднимал DevTools, сек
+        self.ready_time = None      # Полное время до готовой страницы, сек
+        self.blocker = None
         self.is_windows = platform.system() == "Windows"
 
     def _load_config(self):
@@ -60,16 +71,33 @@ class ChromeManager:
             "chrome_path": chrome_path,
             "user_data_dir": user_data_dir,
             "unique_key": "--my-unique-chrome-key-PFXQDuEar6vvacpf40A9",
-            "port_range": {
-                "min": 49152,
-                "max": 65535
-            },
             "args": [
                 "--start-maximized",
                 "--no-first-run"
             ],
             "my_args": {
                 "headless": "windowed"
+            },
+            "startup_timeout": 30,
+            "collect_tabs": 3,
+            "collect_timeout": 15,
+            "direct_claim": True,
+            "block_resources": {
+                "enabled": True,
+                "mode": "abort",
+                "resource_types": ["image", "media", "font"],
+                "hosts": [
+                    "google-analytics.com",
+                    "googletagmanager.com",
+                    "doubleclick.net",
+                    "video.akamai.steamstatic.com",
+                    "video.fastly.steamstatic.com"
+                ],
+                "estimated_kb": {"image": 50, "media": 2000, "font": 40, "other": 20}
+            },
+            "browser_service": {
+                "enabled": True,
+                "idle_timeout": 21600
             }
         }
 
@@ -79,21 +107,89 @@ class ChromeManager:
         logger.debug(f"📝 Создан конфиг: {config_path}")
         return default_config
 
-    def _find_free_port(self):
-        """Находим свободный порт в заданном диапазоне"""
-        port_min = self.config['port_range']['min']
-        port_max = self.config['port_range']['max']
+    def _port_file(self):
+        return Path(self.config['user_data_dir']) / "DevToolsActivePort"
+
+    def _read_port_file(self):
+        """Порт, который Chrome реально занял: первая строка DevToolsActivePort в папке профиля"""
+        try:
+            port = int(self._port_file().read_text(encoding='utf-8').split("\n", 1)[0])
+        except (OSError, ValueError):
+            return None
+        return port or None
+
+    def _pid_file(self):
+        return Path(self.config['user_data_dir']) / PID_FILE
+
+    def _write_pid_file(self):
+        """Запоминаем PID и группу процессов запущенного Chrome, чтобы потом убить именно его дерево"""
+        pid = self.process.pid
+        atomic_write_json(self._pid_file(), {
+            "pid": pid,
+            "pgid": pid if self.is_windows else os.getpgid(pid),
+            "create_time": psutil.Process(pid).create_time(),
+            "unique_key": self.unique_key,
+        })
+
+    def _read_pid_file(self):
+        """Данные PID-файла и живой процесс из него.
+        Процесс None, если Chrome уже завершился или его PID достался другому процессу.
+        """
+        try:
+            with open(self._pid_file(), 'r', encoding='utf-8') as f:
+                info = json.load(f)
+        except (OSError, ValueError):
+            return None, None
+
+        try:
+            proc = psutil.Process(info["pid"])
+            # Сверяем время старта - PID мог освободиться и достаться чужому процессу
+            if abs(proc.create_time() - info["create_time"]) > 1:
+                return info, None
+        except (psutil.Error, KeyError, TypeError):
+            return info, None
+        return info, proc
+
+    def _profile_locked(self):
+        """Chrome держит этот профиль: SingletonLock на Linux/macOS, lockfile на Windows"""
+        user_data_dir = Path(self.config['user_data_dir'])
+        return any(os.path.lexists(user_data_dir / name) for name in ("SingletonLock", "lockfile"))
+
+    def _kill_tree(self, proc, pgid):
+        """Убиваем Chrome вместе со всеми дочерними процессами и ждём, пока они завершатся"""
+        try:
+            procs = [proc] + proc.children(recursive=True)
+        except psutil.Error:
+            procs = [proc]
 
-        for _ in range(100):
-            port = random.randint(port_min, port_max)
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                if s.connect_ex(('127.0.0.1', port)) != 0:
-                    return port
+        logger.debug(f"🔪 Убиваем Chrome (PID: {proc.pid}, процессов: {len(procs)})")
+        if self.is_windows:
+            try:
+                subprocess.run(['taskkill', '/PID', str(proc.pid), '/F', '/T'],
+                               stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL,
+                               timeout=5)
+            except Exception as e:
+                logger.warning(f"Ошибка taskkill: {e}")
+        else:
+            try:
+                os.killpg(pgid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError, TypeError):
+                pass
+            # Процессы, которые успели сменить группу
+            for p in procs:
+                try:
+                    p.kill()
+                except psutil.Error:
+                    pass
 
-        raise RuntimeError("Не найден свободный порт")
+        gone, alive = psutil.wait_procs(procs, timeout=5)
+        if alive:
+            logger.warning(f"Не завершились процессы Chrome: {[p.pid for p in alive]}")
+        return len(gone)
 
     def _kill_by_unique_key(self):
-        """Убиваем процесс по уникальному ключу"""
+        """Убиваем процесс по уникальному ключу, обходя все процессы системы. Запасной путь, если PID-файла нет"""
         killed_count = 0
         for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
             try:
@@ -124,38 +220,58 @@ class ChromeManager:
             except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.TimeoutExpired):
                 pass
 
-        if killed_count > 0:
-            logger.debug(f"🛑 Убито процессов: {killed_count}")
-            import time
-            time.sleep(1)
+        return killed_count
 
-            # Чистка префов
-            pref_path = os.path.join(self.config['user_data_dir'], "Default", "Preferences")
-            if not os.path.exists(pref_path):
-                logger.warning(f"🚫 Не удалось найти префы: {pref_path}")
-                return
+    def _fix_preferences(self):
+        """После убийства Chrome помечаем выход как штатный, иначе при старте он предложит восстановить вкладки"""
+        pref_path = os.path.join(self.config['user_data_dir'], "Default", "Preferences")
+        if not os.path.exists(pref_path):
+            logger.warning(f"🚫 Не удалось найти префы: {pref_path}")
+            return
 
-            try:
-                with open(pref_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                logger.debug(f"Поправили префы: {pref_path}")
+        try:
+            with open(pref_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            
+            logger.debug(f"Поправили префы: {pref_path}")
 
-                if "profile" in data:
-                    data["profile"]["exit_type"] = "Normal"
+            if "profile" in data:
+                data["profile"]["exit_type"] = "Normal"
 
-                if "sessions" in data:
-                    data["sessions"]["event_log"] = []
+            if "sessions" in data:
+                data["sessions"]["event_log"] = []
 
-                with open(pref_path, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, indent=4)
-            except json.JSONDecodeError as e:
-                logger.warning(f"Ошибка парсинга JSON: {e}")
-            except Exception as e:
-                logger.error(f"Ошибка при работе с префами: {e}")
+            with open(pref_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=4)
+        except json.JSONDecodeError as e:
+            logger.warning(f"Ошибка парсинга JSON: {e}")
+        except Exception as e:
+            logger.error(f"Ошибка при работе с префами: {e}")
+
+    def _kill_profile_chrome(self):
+        """Убиваем Chrome этого профиля: дерево процессов из PID-файла.
+        Полный обход процессов - только если PID-файла нет, а профиль при этом кем-то занят.
+        """
+        info, proc = self._read_pid_file()
+        if proc is not None:
+            killed_count = self._kill_tree(proc, info.get("pgid"))
+        elif info is None and self._profile_locked():
+            killed_count = self._kill_by_unique_key()
+        else:
+            killed_count = 0
+
+        self._pid_file().unlink(missing_ok=True)
+
+        if killed_count > 0:
+            logger.debug(f"🛑 Убито процессов: {killed_count}")
+            self._fix_preferences()
 
         return killed_count > 0
 
+    async def _kill_chrome(self):
+        """Убийство и ожидание процессов и правка префов - в отдельном потоке, чтобы не блокировать цикл событий"""
+        return await asyncio.to_thread(self._kill_profile_chrome)
+
 
     def _build_args(self):
         """Собираем аргументы запуска"""
@@ -164,9 +280,10 @@ class ChromeManager:
         # Уникальный ключ из конфига
         args.append(self.unique_key)
 
-        # Порт
-        self.port = self._find_free_port()
-        args.append(f"--remote-debugging-port={self.port}")
+        # Порт 0 - Chrome сам занимает свободный порт и пишет его в DevToolsActivePort.
+        # Гонки между проверкой порта и его занятием нет, сколько бы браузеров ни стартовало параллельно
+        self.port = None
+        args.append("--remote-debugging-port=0")
 
         # User data dir - создаём если не существует
         user_data_dir = Path(self.config['user_data_dir']).absolute()
@@ -197,13 +314,44 @@ class ChromeManager:
         return args
 
 
+    async def _wait_until_ready(self, timeout):
+        """Ждём, пока Chrome запишет порт в DevToolsActivePort и DevTools начнёт отвечать на /json/version.
+        Интервал опроса растёт от 50 мс до 500 мс, общий предел - timeout секунд.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        interval = 0.05
+
+        while True:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Chrome завершился при запуске (код {self.process.returncode})")
+
+            if self.port is None:
+                self.port = self._read_port_file()
+
+            if self.port is not None:
+                try:
+                    info = await asyncio.to_thread(self._fetch_json, f"http://127.0.0.1:{self.port}/json/version")
+                    return info
+                except (OSError, ValueError):
+                    pass
+
+            if loop.time() + interval > deadline:
+                raise TimeoutError(f"DevTools Chrome не ответил за {timeout} сек (порт: {self.port})")
+
+            await asyncio.sleep(interval)
+            interval = min(interval * 1.5, 0.5)
+
+    @staticmethod
+    def _fetch_json(url):
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return json.loads(response.read())
+
     async def start(self):
         """Запускаем Chrome и подключаем Playwright"""
 
-        # Убиваем старые процессы с этим ключом, если они почемуто остались
-        self._kill_by_unique_key()
-
-        await asyncio.sleep(0.5)
+        # Убиваем старые процессы этого профиля, если они почемуто остались
+        await self._kill_chrome()
 
         # Собираем команду
         chrome_path = self.config['chrome_path']
@@ -211,49 +359,53 @@ class ChromeManager:
 
         cmd = [chrome_path] + args
 
-        # Запускаем процесс
+        # Старый DevToolsActivePort остаётся после убитого Chrome, порт из него уже недействителен
+        self._port_file().unlink(missing_ok=True)
+
+        started = time.perf_counter()
+
+        # Запускаем процесс в своей группе процессов, чтобы потом убить всё дерево разом
+        if self.is_windows:
+            group = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+        else:
+            group = {"start_new_session": True}
         self.process = subprocess.Popen(
             cmd,
             stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL
+            stderr=subprocess.DEVNULL,
+            **group
         )
 
-        await asyncio.sleep(2)
-
-        # Подключаем Playwright с повторными попытками
-        self.pw = await async_playwright().start()
+        try:
+            await asyncio.to_thread(self._write_pid_file)
 
-        max_retries = 5
-        for attempt in range(max_retries):
-            try:
-                self.browser = await self.pw.chromium.connect_over_cdp(
-                    f"http://127.0.0.1:{self.port}"
-                )
+            # Вместо фиксированных пауз ждём, пока DevTools реально начнёт отвечать
+            version = await self._wait_until_ready(self.config.get('startup_timeout', 30))
+            self.startup_time = time.perf_counter() - started
+            logger.debug(f"DevTools ответил за {self.startup_time:.2f} сек ({version.get('Browser')})")
 
-                # Получаем контекст и страницу
-                if self.browser.contexts:
-                    context = self.browser.contexts[0]
-                else:
-                    context = await self.browser.new_context()
+            self.pw = await async_playwright().start()
+            self.browser = await self.pw.chromium.connect_over_cdp(f"http://127.0.0.1:{self.port}")
 
-                if context.pages:
-                    self.page = context.pages[0]
-                else:
-                    self.page = await context.new_page()
+            # Получаем контекст и страницу
+            if self.browser.contexts:
+                context = self.browser.contexts[0]
+            else:
+                context = await self.browser.new_context()
 
-                await asyncio.sleep(0.5)
+            if context.pages:
+                self.page = context.pages[0]
+            else:
+                self.page = await context.new_page()
 
-                logger.success(f"✅ Chrome запущен (порт: {self.port})")
-                return self.page
+        except Exception as e:
+            logger.error(f"❌ Не удалось запустить Chrome: {e}")
+            await self.cleanup()
+            raise
 
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    logger.debug(f"⚠️ Попытка подключения {attempt + 1}/{max_retries} не удалась: {e}")
-                    await asyncio.sleep(2)  # Ждём перед следующей попыткой
-                else:
-                    logger.error(f"❌ Ошибка после {max_retries} попыток: {e}")
-                    self.cleanup()
-                    raise
+        self.ready_time = time.perf_counter() - started
+        logger.success(f"✅ Chrome запущен (порт: {self.port}) за {self.ready_time:.2f} сек")
+        return self.page
 
     async def cleanup(self):
         if self.browser:
@@ -270,7 +422,32 @@ class ChromeManager:
             except Exception as e:
                 logger.debug(f"Error stopping Playwright: {e}")
         
-        self._kill_by_unique_key()
+        await self._kill_chrome()
+
+
+    async def block_resources(self):
+        """Включаем блокировку тяжёлых ресурсов (block_resources в конфиге) на контексте браузера.
+        Возвращает ResourceBlocker со счётчиками за этот запуск или None, если блокировка выключена.
+        """
+        settings = self.config.get("block_resources", {})
+        if not settings.get("enabled"):
+            return None
+
+        await self.unblock_resources()
+        self.blocker = ResourceBlocker.from_config(settings)
+        await self.page.context.route("**/*", self.blocker.handle)
+        return self.blocker
+
+    async def unblock_resources(self):
+        """Снимаем блокировку, чтобы авторизация и остальные страницы грузились целиком"""
+        if self.blocker is None:
+            return None
+        blocker, self.blocker = self.blocker, None
+        try:
+            await self.page.context.unroute("**/*", blocker.handle)
+        except Exception as e:
+            logger.debug(f"Error removing route: {e}")
+        return blocker
 
 
     async def __aenter__(self):
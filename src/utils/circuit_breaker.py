@@ -0,0 +1,55 @@
+import time
+from loguru import logger
+
+
+class CircuitOpenError(Exception):
+    """Запрос не отправлен: Steam недоступен и предохранитель разомкнут"""
+
+
+class CircuitBreaker:
+    """Предохранитель: после серии ошибок подряд перестаём слать запросы на reset_timeout секунд.
+    Потом пропускаем один пробный запрос (half-open): успех замыкает цепь, ошибка размыкает снова.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probe_started_at = None
+        self.state = "closed"
+
+    def check(self):
+        """Вызываем перед запросом, бросает CircuitOpenError если запросы сейчас запрещены"""
+        if self.state == "closed":
+            return
+
+        now = time.monotonic()
+        if self.state == "half-open":
+            # Пробный запрос один: остальные ждут его результата.
+            # Если пробный так и не отчитался (например, задачу отменили) - через паузу пускаем новый
+            if now - self.probe_started_at < self.reset_timeout:
+                raise CircuitOpenError("Steam недоступен, ждём результата пробного запроса")
+            self.probe_started_at = now
+            return
+
+        if now - self.opened_at >= self.reset_timeout:
+            self.state = "half-open"
+            self.probe_started_at = now
+            logger.info("🔌 Предохранитель: пробный запрос после паузы")
+            return
+
+        raise CircuitOpenError(f"Steam недоступен, запросы приостановлены после {self.failures} ошибок подряд")
+
+    def record_success(self):
+        if self.state != "closed":
+            logger.info("🔌 Предохранитель замкнут, Steam снова отвечает")
+        self.failures = 0
+        self.state = "closed"
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half-open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            logger.error(f"🔌 Предохранитель разомкнут: {self.failures} ошибок подряд, пауза {self.reset_timeout:.0f} сек")
@@ -0,0 +1,100 @@
+import asyncio
+import random
+import requests
+from loguru import logger
+from src.utils.circuit_breaker import CircuitBreaker
+from src.utils.http_session import get_session
+
+
+class AsyncFetcher:
+    """Параллельная загрузка страниц с ограничением одновременных запросов, адаптивным лимитом частоты,
+    повторами с джиттером и предохранителем на случай недоступности Steam
+    """
+
+    # На эти ответы запрос повторяем
+    RETRY_CODES = {429, 500, 502, 503, 504}
+
+    def __init__(self, session=None, concurrency=4, limiter=None, timeout=10, cache=None,
+                 attempts=3, backoff_base=1.0, backoff_max=30.0, breaker=None):
+        # Пул соединений не меньше числа параллельных запросов, иначе лишние соединения будут закрываться
+        self.session = session or get_session(pool_size=max(10, concurrency))
+        self.timeout = timeout
+        self.cache = cache
+        self.semaphore = asyncio.Semaphore(max(1, concurrency))
+        # Общий лимитер частоты, None - без ограничения
+        self.limiter = limiter
+        self.attempts = max(1, attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+
+    def _use_cache(self, url, params):
+        return self.cache is not None and not params and self.cache.cacheable(url)
+
+    def _fresh_from_cache(self, url):
+        entry = self.cache.load(url)
+        if entry and self.cache.is_fresh(url, entry):
+            return self.cache.to_response(entry)
+        return None
+
+    def _request(self, url, params=None):
+        cache = self.cache if self._use_cache(url, params) else None
+        entry = None
+        headers = None
+
+        if cache:
+            entry = cache.load(url)
+            if entry:
+                headers = cache.conditional_headers(entry)
+
+        response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+
+        if cache:
+            if response.status_code == 304 and entry:
+                cache.touch(url, entry)
+                return cache.to_response(entry)
+            cache.store(url, response)
+
+        return response
+
+    async def get(self, url, params=None):
+        """GET запрос в отдельном потоке, не блокирует event loop. Свежие записи кэша отдаются без запроса"""
+        if self._use_cache(url, params):
+            response = await asyncio.to_thread(self._fresh_from_cache, url)
+            if response:
+                logger.debug(f"Ответ из кэша {url}")
+                return response
+
+        error = None
+        for attempt in range(1, self.attempts + 1):
+            self.breaker.check()
+
+            try:
+                async with self.semaphore:
+                    if self.limiter:
+                        await self.limiter.acquire(url)
+                    response = await asyncio.to_thread(self._request, url, params)
+            except requests.RequestException as e:
+                error = e
+            else:
+                from_cache = getattr(response, "from_cache", False)
+                if self.limiter and not from_cache:
+                    self.limiter.feedback(url, response)
+
+                revalidated = " (304, из кэша)" if from_cache else ""
+                logger.debug(f"Ответ {response.status_code}{revalidated} {url}")
+
+                if response.status_code not in self.RETRY_CODES:
+                    self.breaker.record_success()
+                    return response
+                error = requests.HTTPError(f"Ответ {response.status_code}", response=response)
+
+            self.breaker.record_failure()
+            if attempt < self.attempts:
+                # Full jitter: случайная пауза до base * 2^n, чтобы параллельные повторы не шли пачкой
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+                logger.debug(f"Попытка {attempt}/{self.attempts} для {url} не удалась ({error}), повтор через {delay:.1f} сек")
+                await asyncio.sleep(delay)
+
+        raise error
+
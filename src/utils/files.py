@@ -0,0 +1,19 @@
+import json
+import os
+from pathlib import Path
+
+
+def atomic_write_json(path, data, indent=4):
+    """Пишем JSON во временный файл рядом и подменяем им старый.
+    При падении посреди записи на диске остаётся либо старый, либо новый файл целиком.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp_path, path)
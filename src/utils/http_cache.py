@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from loguru import logger
+
+
+class CachedResponse:
+    """Ответ из кэша, повторяет нужную нам часть интерфейса requests.Response"""
+
+    def __init__(self, url, text, status_code=200, headers=None):
+        self.url = url
+        self.text = text
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.from_cache = True
+
+
+class HttpCache:
+    """Дисковый кэш ответов по URL с TTL на тип ресурса, ревалидацией ETag/Last-Modified и ограничением размера"""
+
+    def __init__(self, cache_dir="data/cache", max_size_mb=200, ttl=None):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_size = int(max_size_mb * 1024 * 1024)
+        # Тип ресурса -> сколько секунд запись считается свежей без запроса
+        self.ttl = ttl or {}
+        self._lock = threading.Lock()
+        self._size = sum(p.stat().st_size for p in self.cache_dir.glob("*.json"))
+
+    @staticmethod
+    def resource_type(url):
+        """Определяем тип ресурса по URL, от него зависит TTL"""
+        if "/app/" in url:
+            return "app"
+        if "/search/" in url:
+            return "search"
+        return "other"
+
+    def _path(self, url):
+        return self.cache_dir / f"{hashlib.sha1(url.encode('utf-8')).hexdigest()}.json"
+
+    def cacheable(self, url):
+        return self.resource_type(url) in self.ttl
+
+    def load(self, url):
+        """Достаём запись из кэша или None"""
+        path = self._path(url)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        # Обновляем mtime - по нему вытесняем самые давно использованные записи
+        os.utime(path, None)
+        return entry
+
+    def is_fresh(self, url, entry):
+        ttl = self.ttl.get(self.resource_type(url), 0)
+        return time.time() - entry["stored_at"] < ttl
+
+    def conditional_headers(self, entry):
+        """Заголовки для ревалидации: сервер ответит 304 если страница не изменилась"""
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def to_response(self, entry):
+        return CachedResponse(entry["url"], entry["text"], entry.get("status_code", 200), entry.get("headers"))
+
+    def touch(self, url, entry):
+        """Страница не изменилась (304) - продлеваем свежесть записи"""
+        entry["stored_at"] = time.time()
+        self._write(url, entry)
+
+    def store(self, url, response):
+        """Сохраняем успешный ответ"""
+        if response.status_code != 200:
+            return
+
+        entry = {
+            "url": url,
+            "text": response.text,
+            "status_code": response.status_code,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "stored_at": time.time(),
+        }
+        self._write(url, entry)
+
+    def _write(self, url, entry):
+        path = self._path(url)
+        data = json.dumps(entry, ensure_ascii=False)
+
+        with self._lock:
+            old_size = path.stat().st_size if path.exists() else 0
+            tmp_path = path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+            self._size += path.stat().st_size - old_size
+            if self._size > self.max_size:
+                self._evict()
+
+    def _evict(self):
+        """Удаляем самые давно использованные записи, пока кэш не влезет в 90% лимита"""
+        files = sorted(self.cache_dir.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        target = self.max_size * 0.9
+        removed = 0
+        for path in files:
+            if self._size <= target:
+                break
+            try:
+                size = path.stat().st_size
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            self._size -= size
+            removed += 1
+
+        logger.debug(f"🧹 Кэш: удалено записей {removed}, размер {self._size / 1024 / 1024:.1f} МБ")
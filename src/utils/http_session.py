@@ -0,0 +1,43 @@
+import requests
+from requests.adapters import HTTPAdapter
+from fake_useragent import UserAgent
+from loguru import logger
+
+
+_session = None
+
+
+def build_session(pool_size=10):
+    """Создаём сессию с пулом keep-alive соединений и единым набором заголовков"""
+    session = requests.Session()
+
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    session.headers.update({
+        'Referer': 'https://store.steampowered.com/search/?force_infinite=1&maxprice=free&specials=1&ndl=1',
+        'User-Agent': UserAgent(browsers="chrome", platforms="desktop").random,
+        'Accept': '*/*',
+        'Connection': 'keep-alive',
+    })
+
+    logger.debug(f"Создана HTTP сессия (пул: {pool_size})")
+    return session
+
+
+def get_session(pool_size=10):
+    """Общая сессия на весь процесс: живёт между запусками планировщика и переиспользует соединения"""
+    global _session
+    if _session is None:
+        _session = build_session(pool_size)
+    return _session
+
+
+def close_session():
+    """Закрываем пул соединений (при остановке программы)"""
+    global _session
+    if _session is not None:
+        _session.close()
+        _session = None
+        logger.debug("HTTP сессия закрыта")
@@ -0,0 +1,123 @@
+import asyncio
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from loguru import logger
+
+
+def parse_retry_after(value):
+    """Retry-After бывает числом секунд или HTTP датой"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Токен-бакет одного хоста. Скорость растёт на здоровых ответах и падает вдвое на 429/5xx (AIMD)"""
+
+    def __init__(self, host, start_rps, min_rps, max_rps, burst, increase, backoff_base, backoff_max):
+        self.host = host
+        self.rate = min(start_rps, max_rps)
+        self.min_rate = min_rps
+        self.max_rate = max_rps
+        self.capacity = max(1, burst)
+        self.increase = increase
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.failures = 0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        """Ждём токен. Запросы встают в очередь под локом, чтобы не обгонять друг друга"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def on_success(self):
+        self.failures = 0
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+            if self.rate == self.max_rate:
+                logger.debug(f"🚦 {self.host}: скорость дошла до потолка {self.rate:.2f} запр/сек")
+
+    def on_throttle(self, status_code, retry_after=None):
+        """Steam просит притормозить: режем скорость и делаем паузу (Retry-After или экспоненциальную)"""
+        self.failures += 1
+        self.rate = max(self.min_rate, self.rate / 2)
+        backoff = retry_after if retry_after is not None else self.backoff_base * 2 ** (self.failures - 1)
+        backoff = min(backoff, self.backoff_max)
+        self.blocked_until = max(self.blocked_until, time.monotonic() + backoff)
+        self.tokens = 0.0
+        logger.warning(f"🚦 {self.host}: ответ {status_code}, пауза {backoff:.1f} сек, скорость снижена до {self.rate:.2f} запр/сек")
+
+
+class AdaptiveRateLimiter:
+    """Общий для всех запросов коллектора лимитер с отдельным бакетом на каждый хост"""
+
+    THROTTLE_CODES = {429, 500, 502, 503, 504}
+
+    def __init__(self, start_rps=1.0, min_rps=0.2, max_rps=4.0, burst=2, increase=0.1,
+                 backoff_base=2.0, backoff_max=120.0, hosts=None):
+        self.start_rps = start_rps
+        self.min_rps = min_rps
+        self.max_rps = max_rps
+        self.burst = burst
+        self.increase = increase
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # Свой потолок скорости для отдельных хостов
+        self.host_limits = hosts or {}
+        self.buckets = {}
+
+    def _bucket(self, url):
+        host = urlparse(url).netloc
+        if host not in self.buckets:
+            max_rps = self.host_limits.get(host, self.max_rps)
+            self.buckets[host] = TokenBucket(
+                host,
+                start_rps=self.start_rps,
+                min_rps=min(self.min_rps, max_rps),
+                max_rps=max_rps,
+                burst=self.burst,
+                increase=self.increase,
+                backoff_base=self.backoff_base,
+                backoff_max=self.backoff_max
+                )
+        return self.buckets[host]
+
+    async def acquire(self, url):
+        await self._bucket(url).acquire()
+
+    def feedback(self, url, response):
+        """Подстраиваем скорость по ответу сервера"""
+        bucket = self._bucket(url)
+        if response.status_code in self.THROTTLE_CODES:
+            bucket.on_throttle(response.status_code, parse_retry_after(response.headers.get("Retry-After")))
+        else:
+            bucket.on_success()
+
+    def describe(self):
+        return ", ".join(f"{host}: {bucket.rate:.2f} запр/сек" for host, bucket in self.buckets.items())
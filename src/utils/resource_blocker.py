@@ -0,0 +1,68 @@
+from urllib.parse import urlsplit
+
+
+# Примерный размер отброшенного ответа по типу ресурса, КБ - сами ответы мы не скачиваем
+DEFAULT_ESTIMATED_KB = {"image": 50, "media": 2000, "font": 40, "other": 20}
+
+
+class ResourceBlocker:
+    """Правила маршрутизации для страниц сбора: тяжёлые типы ресурсов (картинки, видео, шрифты)
+    и сторонние хосты (аналитика, видео CDN) не загружаются. Кнопке "добавить в библиотеку" они не нужны.
+    mode "abort" - запрос обрывается, "stub" - отдаётся пустой ответ 200 (для скриптов, которые падают на ошибке сети).
+    """
+
+    def __init__(self, resource_types=(), hosts=(), mode="abort", estimated_kb=None):
+        self.resource_types = set(resource_types)
+        self.hosts = tuple(host.lower() for host in hosts)
+        self.mode = mode
+        self.estimated_kb = {**DEFAULT_ESTIMATED_KB, **(estimated_kb or {})}
+        self.reset()
+
+    @classmethod
+    def from_config(cls, settings):
+        return cls(
+            resource_types=settings.get("resource_types", ()),
+            hosts=settings.get("hosts", ()),
+            mode=settings.get("mode", "abort"),
+            estimated_kb=settings.get("estimated_kb"),
+        )
+
+    def reset(self):
+        """Обнуляем счётчики - они считаются за один запуск сбора"""
+        self.allowed = 0
+        self.blocked = 0
+        self.blocked_by_type = {}
+        self.saved_bytes = 0
+
+    def _blocked_host(self, url):
+        host = (urlsplit(url).hostname or "").lower()
+        return any(host == blocked or host.endswith("." + blocked) for blocked in self.hosts)
+
+    def should_block(self, resource_type, url):
+        return resource_type in self.resource_types or self._blocked_host(url)
+
+    async def handle(self, route):
+        request = route.request
+        resource_type = request.resource_type
+
+        if not self.should_block(resource_type, request.url):
+            self.allowed += 1
+            await route.continue_()
+            return
+
+        self.blocked += 1
+        self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + 1
+        kb = self.estimated_kb.get(resource_type, self.estimated_kb["other"])
+        self.saved_bytes += kb * 1024
+
+        if self.mode == "stub":
+            await route.fulfill(status=200, body=b"")
+        else:
+            await route.abort()
+
+    def describe(self):
+        total = self.allowed + self.blocked
+        share = self.blocked / total * 100 if total else 0
+        by_type = ", ".join(f"{t}: {n}" for t, n in sorted(self.blocked_by_type.items(), key=lambda item: -item[1]))
+        return (f"заблокировано запросов {self.blocked} из {total} ({share:.0f}%), "
+                f"сэкономлено ~{self.saved_bytes / 1024 / 1024:.1f} МБ" + (f" [{by_type}]" if by_type else ""))